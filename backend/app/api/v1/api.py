@@ -3,7 +3,7 @@ API v1 router - Aggregates all v1 endpoints
 """
 from fastapi import APIRouter
 
-from .endpoints import auth, patients, health, clinical, administrative, system
+from .endpoints import auth, patients, health, metrics, clinical, administrative, system
 
 api_router = APIRouter()
 
@@ -11,6 +11,7 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(patients.router, prefix="/patients", tags=["patients"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["health"])
 api_router.include_router(clinical.router, prefix="/clinical", tags=["clinical"])
 api_router.include_router(administrative.router, prefix="/administrative", tags=["administrative"])
 api_router.include_router(system.router, prefix="/system", tags=["system"])
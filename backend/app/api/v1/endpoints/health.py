@@ -3,6 +3,9 @@ Health check endpoint
 """
 from fastapi import APIRouter
 
+from ....core.cache import get_cache_stats
+from ....core.database import get_pool_stats
+
 router = APIRouter()
 
 
@@ -11,3 +14,15 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+
+
+@router.get("/db-pool")
+async def db_pool_status():
+    """Connection pool gauges (in use / idle / overflow) and checkout wait times"""
+    return get_pool_stats()
+
+
+@router.get("/cache")
+async def cache_status():
+    """Hit/miss counters for the application caches"""
+    return get_cache_stats()
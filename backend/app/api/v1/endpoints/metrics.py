@@ -0,0 +1,17 @@
+"""
+Metrics endpoint (Prometheus text format)
+"""
+from fastapi import APIRouter, Response
+
+from ....core.metrics import registry
+
+router = APIRouter()
+
+# Starlette appends the charset to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("")
+async def metrics():
+    """Request latency per route template, in-flight requests, pool, cache and serialization metrics for this worker"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,24 +1,42 @@
 """
 Patient endpoints
 """
-from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
 from .... import schemas
-from ....core.database import get_db
+from ....core.database import get_async_db
 from ....core.security import get_current_user, User
 from ....core.permissions import require_clinical_staff_or_admin
+from ....core.config import settings
+from ....core.etag import CACHE_CONTROL, etag_matches
+from ....core.metrics import time_serialization
 from ....services.patients import (
-    get_paginated_patients,
-    get_patient_by_id,
-    create_patient,
-    update_patient_personal_info,
-    update_patient_emergency_contact,
-    update_patient_insurance_info,
-    update_patient_medical_info,
-    update_patient_medications,
+    get_paginated_patients_coalesced_async,
+    get_patient_detail_json_async,
+    get_patient_version_async,
+    get_patient_list_version_async,
+    patient_etag,
+    patient_list_etag,
+    create_patient_async,
+    update_patient_personal_info_async,
+    update_patient_emergency_contact_async,
+    update_patient_insurance_info_async,
+    update_patient_medical_info_async,
+    update_patient_medications_async,
+)
+from ....services.bulk_import import detect_import_format, import_patients_async
+from ....services.facets import get_patient_facets_json_async
+from ....services.stats import get_patient_stats_json_async
+from ....services.export import (
+    EXPORT_FORMATS,
+    build_export_statement,
+    parse_export_columns,
+    stream_patient_export,
 )
 
 logger = logging.getLogger(__name__)
@@ -26,10 +44,62 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def model_response(model: BaseModel, response: Response, headers: Dict[str, str], status_code: int = 200):
+    """
+    Return a response model with extra headers
+    
+    With FAST_JSON_RESPONSES the model (built with model_construct by the
+    service) is serialized straight to JSON bytes by pydantic's core
+    serializer, bypassing FastAPI's response_model validation and the
+    intermediate dict. Otherwise the model is returned as usual and the
+    headers are set on the injected response.
+    """
+    if settings.FAST_JSON_RESPONSES:
+        with time_serialization("fast_json"):
+            content = model.model_dump_json(by_alias=True)
+        return Response(content=content, media_type="application/json", status_code=status_code, headers=headers)
+    response.headers.update(headers)
+    return model
+
+
+def patient_filter_params(
+    # Search
+    search: Optional[str] = Query(None, description="Search across name, email, phone"),
+    # Filters
+    status: Optional[str] = Query(None, description="Filter by status: active, inactive, critical"),
+    blood_type: Optional[str] = Query(None, description="Filter by blood type: A+, A-, B+, B-, AB+, AB-, O+, O-"),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    state: Optional[str] = Query(None, description="Filter by state"),
+    insurance_provider: Optional[List[str]] = Query(None, description="Filter by insurance provider (can specify multiple)"),
+    allergies: Optional[List[str]] = Query(None, description="Filter by allergy (can specify multiple)"),
+    current_medications: Optional[List[str]] = Query(None, description="Filter by current medication name (can specify multiple)"),
+    conditions: Optional[List[str]] = Query(None, description="Filter by condition (can specify multiple)"),
+    last_visit: Optional[str] = Query(None, description="Filter by last visit: last_week, last_month, last_3_months, last_6_months, last_year, over_year"),
+    allergies_match: str = Query("any", regex="^(any|all)$", description="Match any or all of the given allergies"),
+    conditions_match: str = Query("any", regex="^(any|all)$", description="Match any or all of the given conditions"),
+) -> Dict[str, Any]:
+    """Search/filter query parameters shared by the list, export and facets"""
+    return dict(
+        search=search,
+        status=status,
+        blood_type=blood_type,
+        city=city,
+        state=state,
+        insurance_provider=insurance_provider,
+        allergies=allergies,
+        current_medications=current_medications,
+        conditions=conditions,
+        last_visit=last_visit,
+        allergies_match=allergies_match,
+        conditions_match=conditions_match,
+    )
+
+
 @router.post("", response_model=schemas.Patient, response_model_by_alias=True, status_code=201)
 async def create_patient_endpoint(
     patient_data: schemas.PatientCreate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -40,78 +110,199 @@ async def create_patient_endpoint(
     - Admin: Can create patients
     - System Admin: Full access
     """
-    return create_patient(db=db, patient_data=patient_data)
+    patient = await create_patient_async(db=db, patient_data=patient_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)}, status_code=201)
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResult, response_model_by_alias=True)
+async def bulk_import_patients(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_clinical_staff_or_admin()),
+):
+    """
+    Create many patients from one upload
+    
+    The body is either sent raw (Content-Type application/json with an array
+    of patients, application/x-ndjson, or text/csv) or as a multipart upload
+    in a field named "file" (format taken from the file extension).
+    
+    JSON/NDJSON rows use the create-patient payload. CSV rows use the export
+    column names (allergies/conditions separated by ";"; no medications).
+    
+    Each row is validated independently: the response counts created rows
+    and lists every rejected row with its 1-based position and reasons
+    (validation errors, duplicate or existing email).
+    
+    Access:
+    - Clinical Staff: Can import patients
+    - Admin: Can import patients
+    - System Admin: Full access
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart upload must include a 'file' field")
+        import_format = detect_import_format(upload.content_type, upload.filename)
+        data = await upload.read()
+    else:
+        import_format = detect_import_format(content_type)
+        data = await request.body()
+    
+    return await import_patients_async(db=db, data=data, import_format=import_format)
 
 
 @router.get("", response_model=schemas.PaginatedPatients, response_model_by_alias=True)
 async def get_patients(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
+    if_none_match: Optional[str] = Header(None),
     # Pagination
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(25, ge=1, le=100, description="Items per page"),
-    # Search
-    search: Optional[str] = Query(None, description="Search across name, email, phone"),
-    # Filters
-    status: Optional[str] = Query(None, description="Filter by status: active, inactive, critical"),
-    blood_type: Optional[str] = Query(None, description="Filter by blood type: A+, A-, B+, B-, AB+, AB-, O+, O-"),
-    city: Optional[str] = Query(None, description="Filter by city"),
-    state: Optional[str] = Query(None, description="Filter by state"),
-    insurance_provider: Optional[List[str]] = Query(None, description="Filter by insurance provider (can specify multiple)"),
-    allergies: Optional[str] = Query(None, description="Filter by allergy"),
-    current_medications: Optional[List[str]] = Query(None, description="Filter by current medication name (can specify multiple)"),
-    conditions: Optional[List[str]] = Query(None, description="Filter by condition (can specify multiple)"),
-    last_visit: Optional[str] = Query(None, description="Filter by last visit: last_week, last_month, last_3_months, last_6_months, last_year, over_year"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous response's nextCursor (overrides page)"),
+    count_mode: str = Query("auto", regex="^(auto|exact|estimate)$", description="Total count mode: auto, exact or estimate"),
+    # Search and filters
+    filters: Dict[str, Any] = Depends(patient_filter_params),
     # Sorting
     sort_by: Optional[str] = Query(
         "createdAt",
-        description="Sort by field: firstName, lastName, dateOfBirth, createdAt, status, insuranceProvider"
+        description="Sort by field: firstName, lastName, dateOfBirth, createdAt, status, insuranceProvider, relevance (with search)"
     ),
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order: asc or desc"),
 ):
     """
     Get paginated patients with search, filter, and sort capabilities
     
-    - **search**: Search across patient name, email, and phone
+    - **search**: Search across patient name, email, and phone (phone matching ignores punctuation)
     - **status**: Filter by patient status (active, inactive, critical)
     - **blood_type**: Filter by blood type
     - **city/state**: Filter by location
     - **insurance_provider**: Filter by insurance provider
+    - **allergies/conditions**: Filter by one or more values; allergies_match /
+      conditions_match choose any (default) or all
     - **sort_by**: Field to sort by (default: createdAt)
     - **sort_order**: Sort direction - asc or desc (default: desc)
+    - **cursor**: Keyset pagination - pass nextCursor from the previous page
+      instead of page to get constant-cost deep pages
+    - **count_mode**: auto (default) uses a cached exact count or, for large
+      result sets, the planner estimate; totalIsEstimate flags estimates
+    
+    Responses carry an ETag; send it back in If-None-Match to get a 304 when
+    no patient has changed since.
     """
-    # Debug logging
-    logger.info(f"[DEBUG] Page: {page}, page_size: {page_size}, search: {search}, status: {status}, sort_by: {sort_by}")
+    logger.debug("List request: page=%s page_size=%s search=%r status=%r sort_by=%s", page, page_size, filters["search"], filters["status"], sort_by)
     
-    # Get paginated patients using service
-    result = get_paginated_patients(
-        db=db,
+    list_params = dict(
         page=page,
         page_size=page_size,
-        search=search,
-        status=status,
-        blood_type=blood_type,
-        city=city,
-        state=state,
-        insurance_provider=insurance_provider,
-        allergies=allergies,
-        current_medications=current_medications,
-        conditions=conditions,
-        last_visit=last_visit,
+        **filters,
         sort_by=sort_by,
         sort_order=sort_order,
+        count_mode=count_mode,
     )
     
-    logger.info(f"[DEBUG] Total patients: {result.total}, Retrieved: {len(result.items)}, Total pages: {result.totalPages}")
+    # Conditional GET: answer 304 before running the list query
+    list_version = await get_patient_list_version_async(db)
+    etag = patient_list_etag(list_version, cursor=cursor, **list_params)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
     
-    return result
+    # Get paginated patients using service; identical concurrent requests
+    # (same parameters and list version, i.e. same ETag) share one query
+    result = await get_paginated_patients_coalesced_async(db=db, key=etag, cursor=cursor, list_version=list_version, **list_params)
+    
+    logger.debug("List result: total=%s retrieved=%s total_pages=%s", result.total, len(result.items), result.totalPages)
+    
+    return model_response(result, response, {"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+@router.get("/export")
+async def export_patients(
+    current_user: User = Depends(require_clinical_staff_or_admin()),
+    # Output
+    format: str = Query("csv", regex="^(csv|ndjson)$", description="Output format: csv or ndjson"),
+    columns: Optional[List[str]] = Query(None, description="Columns to export (repeat or comma-separate; default: all)"),
+    gzip: bool = Query(False, description="Gzip the response body (Content-Encoding: gzip)"),
+    # Search and filters
+    filters: Dict[str, Any] = Depends(patient_filter_params),
+    # Sorting
+    sort_by: Optional[str] = Query("createdAt", description="Sort by field (same values as the list)"),
+    sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order: asc or desc"),
+):
+    """
+    Stream every patient matching the list filters as CSV or NDJSON
+    
+    Takes the same search/filter/sort parameters as GET /patients, without
+    pagination. Rows are streamed from a server-side cursor, so exports of
+    any size use constant memory.
+    
+    - **format**: csv (default; allergies/conditions joined with ";") or ndjson
+    - **columns**: Subset of patient columns, e.g. columns=id,first_name,email
+    - **gzip**: Compress the body
+    """
+    export_columns = parse_export_columns(columns)
+    statement = build_export_statement(
+        export_columns,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        **filters,
+    )
+    
+    headers = {"Content-Disposition": f'attachment; filename="patients.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_patient_export(statement, export_columns, export_format=format, compress=gzip),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers,
+    )
+
+
+@router.get("/facets", response_model=schemas.PatientFacets, response_model_by_alias=True)
+async def get_patient_facets(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_clinical_staff_or_admin()),
+    filters: Dict[str, Any] = Depends(patient_filter_params),
+):
+    """
+    Counts for the filter sidebar
+    
+    Takes the same search/filter parameters as GET /patients and returns,
+    for the matching patients, counts per status, blood type, insurance
+    provider, condition, allergy and last-visit bucket (buckets are
+    cumulative, like the last_visit filter). Computed in one query and
+    cached per filter combination until a patient changes.
+    """
+    payload = await get_patient_facets_json_async(db=db, **filters)
+    return Response(payload, media_type="application/json")
+
+
+@router.get("/stats", response_model=schemas.PatientStats, response_model_by_alias=True)
+async def get_patient_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_clinical_staff_or_admin()),
+):
+    """
+    Dashboard totals
+    
+    Patients by status and insurance provider, critical patients and visits
+    in the last 7/30 days. Read from the incrementally maintained
+    patient_stats table and micro-cached per worker for a few seconds.
+    """
+    payload = await get_patient_stats_json_async(db=db)
+    return Response(payload, media_type="application/json")
 
 
 @router.get("/{patient_id}", response_model=schemas.Patient, response_model_by_alias=True)
 async def get_patient(
     patient_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Get a single patient by ID with full details
@@ -120,6 +311,9 @@ async def get_patient(
     - Clinical Staff: Full access to all patient data
     - Admin: Limited access (demographics, insurance, no deep clinical details)
     - System Admin: Full access
+    
+    Responses carry an ETag derived from updatedAt; send it back in
+    If-None-Match to get a 304 while the chart is unchanged.
     """
     from ....core.permissions import is_admin
     
@@ -127,14 +321,22 @@ async def get_patient(
     # This would be handled in the service layer if needed
     # For now, all authenticated users can view full patient details
     # TODO: Implement limited view for admin users
-    return get_patient_by_id(db=db, patient_id=patient_id)
+    version = await get_patient_version_async(db=db, patient_id=patient_id)
+    headers = {"ETag": patient_etag(patient_id, version), "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    # Served from the patient detail cache when the chart is unchanged
+    payload = await get_patient_detail_json_async(db=db, patient_id=patient_id, version=version)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
 @router.patch("/{patient_id}/personal-info", response_model=schemas.Patient, response_model_by_alias=True)
 async def update_patient_personal_info_endpoint(
     patient_id: str,
     update_data: schemas.PersonalInfoUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -145,14 +347,16 @@ async def update_patient_personal_info_endpoint(
     - Admin: Can update personal info (demographics)
     - System Admin: Full access
     """
-    return update_patient_personal_info(db=db, patient_id=patient_id, update_data=update_data)
+    patient = await update_patient_personal_info_async(db=db, patient_id=patient_id, update_data=update_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)})
 
 
 @router.patch("/{patient_id}/emergency-contact", response_model=schemas.Patient, response_model_by_alias=True)
 async def update_patient_emergency_contact_endpoint(
     patient_id: str,
     update_data: schemas.EmergencyContactUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -163,14 +367,16 @@ async def update_patient_emergency_contact_endpoint(
     - Admin: Can update emergency contact
     - System Admin: Full access
     """
-    return update_patient_emergency_contact(db=db, patient_id=patient_id, update_data=update_data)
+    patient = await update_patient_emergency_contact_async(db=db, patient_id=patient_id, update_data=update_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)})
 
 
 @router.patch("/{patient_id}/insurance", response_model=schemas.Patient, response_model_by_alias=True)
 async def update_patient_insurance_endpoint(
     patient_id: str,
     update_data: schemas.InsuranceInfoUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -181,14 +387,16 @@ async def update_patient_insurance_endpoint(
     - Admin: Can update insurance info
     - System Admin: Full access
     """
-    return update_patient_insurance_info(db=db, patient_id=patient_id, update_data=update_data)
+    patient = await update_patient_insurance_info_async(db=db, patient_id=patient_id, update_data=update_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)})
 
 
 @router.patch("/{patient_id}/medical-info", response_model=schemas.Patient, response_model_by_alias=True)
 async def update_patient_medical_info_endpoint(
     patient_id: str,
     update_data: schemas.MedicalInfoUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -199,14 +407,16 @@ async def update_patient_medical_info_endpoint(
     - Admin: Can update medical info
     - System Admin: Full access
     """
-    return update_patient_medical_info(db=db, patient_id=patient_id, update_data=update_data)
+    patient = await update_patient_medical_info_async(db=db, patient_id=patient_id, update_data=update_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)})
 
 
 @router.patch("/{patient_id}/medications", response_model=schemas.Patient, response_model_by_alias=True)
 async def update_patient_medications_endpoint(
     patient_id: str,
     update_data: schemas.MedicationsUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_clinical_staff_or_admin()),
 ):
     """
@@ -217,5 +427,6 @@ async def update_patient_medications_endpoint(
     - Admin: Can update medications
     - System Admin: Full access
     """
-    return update_patient_medications(db=db, patient_id=patient_id, update_data=update_data)
+    patient = await update_patient_medications_async(db=db, patient_id=patient_id, update_data=update_data)
+    return model_response(patient, response, {"ETag": patient_etag(patient.id, patient.updatedAt)})
 
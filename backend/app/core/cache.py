@@ -0,0 +1,199 @@
+"""
+Pluggable byte cache
+
+Backends store opaque bytes under string keys with a TTL:
+- memory: in-process LRU + TTL (default, per worker process)
+- redis: shared Redis-compatible server (requires the optional ``redis``
+  package; set CACHE_BACKEND=redis and REDIS_URL)
+- none: caching disabled
+
+The interface is async so network backends never block the event loop.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+from .config import settings
+from .singleflight import patient_list_flight
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis-compatible backend (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._client.set(key, value, px=int(ttl_seconds * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class NullCacheBackend:
+    """Backend that never stores anything"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        return None
+
+    async def delete(self, key: str) -> None:
+        return None
+
+    def size(self) -> int:
+        return 0
+
+
+class Cache:
+    """
+    Namespaced, versioned cache with hit/miss counters
+
+    Every entry is stored together with a version string (e.g. a row's
+    updated_at); a lookup only hits when the caller's current version matches,
+    so entries written by another worker before an update are never served.
+    Backend errors are logged and treated as misses, so an unavailable Redis
+    degrades to uncached reads instead of failing requests.
+    """
+
+    def __init__(self, namespace: str, backend, ttl_seconds: float):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str, version: str) -> Optional[bytes]:
+        try:
+            entry = await self.backend.get(self._key(key))
+        except Exception:
+            logger.exception("Cache get failed for %s", self.namespace)
+            self.errors += 1
+            entry = None
+        value = None
+        if entry is not None:
+            entry_version, _, entry_value = entry.partition(b"\n")
+            if entry_version == version.encode("utf-8"):
+                value = entry_value
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, version: str, value: bytes) -> None:
+        entry = version.encode("utf-8") + b"\n" + value
+        try:
+            await self.backend.set(self._key(key), entry, self.ttl_seconds)
+        except Exception:
+            logger.exception("Cache set failed for %s", self.namespace)
+            self.errors += 1
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.backend.delete(self._key(key))
+        except Exception:
+            logger.exception("Cache delete failed for %s", self.namespace)
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": self.backend.size(),
+        }
+
+
+def create_cache_backend(backend_name: Optional[str] = None):
+    """Build the backend selected by CACHE_BACKEND"""
+    backend_name = (backend_name or settings.CACHE_BACKEND).lower()
+    if backend_name == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    if backend_name == "none":
+        return NullCacheBackend()
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+# Serialized patient detail responses (see services.patients)
+patient_detail_cache = Cache(
+    "patient-detail",
+    create_cache_backend(),
+    ttl_seconds=settings.PATIENT_CACHE_TTL_SECONDS,
+)
+
+# Serialized filter-sidebar facet counts, keyed by filter signature
+# (see services.facets)
+patient_facets_cache = Cache(
+    "patient-facets",
+    create_cache_backend(),
+    ttl_seconds=settings.FACETS_CACHE_TTL_SECONDS,
+)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters for every cache (and the list coalescing layer)"""
+    return {
+        patient_detail_cache.namespace: patient_detail_cache.stats(),
+        patient_facets_cache.namespace: patient_facets_cache.stats(),
+        patient_list_flight.namespace: patient_list_flight.stats(),
+    }
@@ -43,9 +43,87 @@ class Settings:
     # Database Settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     
+    # Database Pool Settings (applied to each engine, per worker process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Seconds to wait for a free connection before raising
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Recycle connections older than this many seconds (-1 disables)
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Ping connections on checkout (costs one round trip per checkout)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+    # "session" (direct Postgres / pgbouncer session pooling) or "transaction"
+    # (pgbouncer transaction pooling - disables prepared statement reuse)
+    DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "session").lower()
+    # Worker processes serving the app (gunicorn.conf.py sets this to its
+    # actual worker count in each worker; set it yourself for uvicorn --workers)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Connections one instance may hold across all its workers and both
+    # engines, divided per worker (0 = DB_POOL_SIZE + DB_MAX_OVERFLOW per
+    # engine per worker). gunicorn.conf.py defaults it to 30.
+    DB_POOL_BUDGET: int = int(os.getenv("DB_POOL_BUDGET", "0"))
+    
+    # Startup Settings
+    # Patient count logged at startup: "estimate" (planner statistics, no
+    # table scan), "exact" (COUNT(*), slow on large tables) or "none"
+    STARTUP_PATIENT_COUNT: str = os.getenv("STARTUP_PATIENT_COUNT", "estimate").lower()
+    # Log import time per module and startup phase timings once startup completes
+    STARTUP_PROFILE: bool = os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes")
+    
+    # SQL Instrumentation Settings
+    # Statements at or above this many milliseconds are logged (-1 disables)
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    # Per-request statement count / DB time in a Server-Timing response header
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+    
+    # Cache Settings
+    # memory (in-process LRU), redis (needs the redis package) or none
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+    PATIENT_CACHE_TTL_SECONDS: float = float(os.getenv("PATIENT_CACHE_TTL_SECONDS", "300"))
+    FACETS_CACHE_TTL_SECONDS: float = float(os.getenv("FACETS_CACHE_TTL_SECONDS", "60"))
+    
+    # Identical concurrent list requests share one query; results are kept
+    # this long (0 = share in-flight queries only)
+    LIST_COALESCE_TTL_SECONDS: float = float(os.getenv("LIST_COALESCE_TTL_SECONDS", "1"))
+    LIST_COALESCE_MAX_ENTRIES: int = int(os.getenv("LIST_COALESCE_MAX_ENTRIES", "256"))
+    
+    # Serialization Settings
+    # Opt-in fast path: serialize response models straight to JSON bytes
+    # (model_dump_json) instead of FastAPI's response_model re-validation
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+    
     # Pagination Settings
     DEFAULT_PAGE_SIZE: int = 25
     MAX_PAGE_SIZE: int = 100
+    
+    # Dashboard Stats Settings
+    # Full rebuild of the patient_stats summary table (incremental deltas in
+    # between); one worker rebuilds per interval, tracked in the database
+    STATS_RECONCILE_SECONDS: float = float(os.getenv("STATS_RECONCILE_SECONDS", "900"))
+    # Rebuild at worker startup too (gunicorn.conf.py leaves this on for the
+    # first worker only, so recycled workers don't each trigger a rebuild)
+    STATS_RECONCILE_ON_STARTUP: bool = os.getenv("STATS_RECONCILE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    # Per-process cache of the /patients/stats response
+    STATS_CACHE_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_TTL_SECONDS", "5"))
+    
+    # Export Settings
+    # Rows fetched per server-side cursor round trip (and encoded per chunk)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Bulk Import Settings
+    # Patients per multi-row INSERT / transaction. Each patient row binds ~30
+    # parameters and asyncpg allows 32767 per statement, so keep this <= 1000.
+    BULK_IMPORT_CHUNK_SIZE: int = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+    BULK_IMPORT_MAX_ROWS: int = int(os.getenv("BULK_IMPORT_MAX_ROWS", "100000"))
+    
+    # List Totals Settings
+    # Exact counts are cached per filter signature for this many seconds
+    COUNT_CACHE_TTL_SECONDS: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    COUNT_CACHE_MAX_ENTRIES: int = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1024"))
+    # In auto mode, planner estimates at or above this are returned instead of COUNT(*)
+    COUNT_ESTIMATE_THRESHOLD: int = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "100000"))
 
 settings = Settings()
 
@@ -0,0 +1,34 @@
+"""
+ETag helpers for conditional GET
+"""
+from typing import Optional
+import hashlib
+
+# Patient data may be stored by the browser but must be revalidated each time
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag (quoted) derived from the given version parts"""
+    digest = hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag
+
+    Uses the weak comparison RFC 9110 requires for If-None-Match, so W/
+    prefixed validators from intermediaries still match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,324 @@
+"""
+In-process metrics registry with Prometheus text exposition
+
+Counters, gauges and histograms are kept per worker process and rendered in
+the Prometheus text format (0.0.4) by GET /metrics; scrape every worker (or
+aggregate in Prometheus) when running several. Pool and cache figures are
+read from their existing counters at scrape time.
+
+Label values must come from small fixed sets: requests are labelled with the
+route template (``/patients/{patient_id}``), never the raw path, and
+unmatched paths share a single ``<unmatched>`` label.
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+import threading
+import time
+
+
+from .cache import get_cache_stats
+from .database import get_pool_stats
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Serialization buckets in seconds
+SERIALIZATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+UNMATCHED_ROUTE = "<unmatched>"
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base for labelled metrics: one value (or histogram) per label tuple"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        if not values and not self.label_names:
+            values = [((), 0.0)]
+        for key, value in values:
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts, +Inf count, sum)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+        for key, (bucket_counts, count, total) in values:
+            labels = dict(zip(self.label_names, key))
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, bucket_count
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_count", labels, count
+            yield f"{self.name}_sum", labels, total
+
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from a callback at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+        type_name: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self.callback():
+            yield self.name, labels, value
+
+
+class Registry:
+    """Named metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code",
+    ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    ("method", "route"), buckets=LATENCY_BUCKETS,
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled",
+))
+response_serialization_seconds = registry.register(Histogram(
+    "response_serialization_seconds", "Time spent serializing response bodies, by kind",
+    ("kind",), buckets=SERIALIZATION_BUCKETS,
+))
+
+
+def _pool_samples(key: str) -> Callable[[], Iterable[Tuple[Dict[str, str], float]]]:
+    def samples():
+        for engine_name, stats in get_pool_stats().items():
+            if key in stats:
+                yield {"engine": engine_name}, stats[key]
+    return samples
+
+
+def _pool_connections():
+    for engine_name, stats in get_pool_stats().items():
+        for state in ("in_use", "idle", "overflow"):
+            if state in stats:
+                yield {"engine": engine_name, "state": state}, stats[state]
+
+
+def _cache_counts(key: str):
+    def samples():
+        for cache_name, stats in get_cache_stats().items():
+            if "misses" in stats:
+                yield {"cache": cache_name}, stats[key]
+    return samples
+
+
+def _cache_hit_ratios():
+    for cache_name, stats in get_cache_stats().items():
+        if "hit_ratio" in stats:
+            yield {"cache": cache_name}, stats["hit_ratio"]
+        elif "coalesced_ratio" in stats:
+            yield {"cache": cache_name}, stats["coalesced_ratio"]
+
+
+def _coalesced_requests():
+    for cache_name, stats in get_cache_stats().items():
+        if "executions" in stats:
+            for outcome in ("executions", "shared", "hits"):
+                yield {"cache": cache_name, "outcome": outcome}, stats[outcome]
+
+
+registry.register(CallbackMetric(
+    "db_pool_connections", "Pooled connections by engine and state (in_use, idle, overflow)", _pool_connections,
+))
+registry.register(CallbackMetric("db_pool_size", "Configured pool size by engine", _pool_samples("size")))
+registry.register(CallbackMetric(
+    "db_pool_checkouts_total", "Successful pool checkouts by engine", _pool_samples("checkouts"), "counter",
+))
+registry.register(CallbackMetric(
+    "db_pool_checkout_timeouts_total", "Pool checkouts that timed out by engine", _pool_samples("timeouts"), "counter",
+))
+registry.register(CallbackMetric(
+    "db_pool_checkout_wait_seconds_total", "Time spent waiting for pool checkouts by engine",
+    _pool_samples("wait_seconds_total"), "counter",
+))
+registry.register(CallbackMetric("cache_hits_total", "Cache hits by cache", _cache_counts("hits"), "counter"))
+registry.register(CallbackMetric("cache_misses_total", "Cache misses by cache", _cache_counts("misses"), "counter"))
+registry.register(CallbackMetric(
+    "cache_hit_ratio", "Hits / lookups since start by cache (share of coalesced calls for single-flight layers)",
+    _cache_hit_ratios,
+))
+registry.register(CallbackMetric(
+    "coalesced_calls_total", "Single-flight calls by outcome (executions, shared in-flight, reused result)",
+    _coalesced_requests, "counter",
+))
+
+
+@contextmanager
+def time_serialization(kind: str) -> Iterator[None]:
+    """Observe the block's duration in response_serialization_seconds (kind must be a fixed name)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        response_serialization_seconds.observe(time.perf_counter() - start, kind=kind)
+
+
+def route_template(scope) -> str:
+    """
+    The matched route's path template, or UNMATCHED_ROUTE
+
+    Read after the request: the router stores the route it dispatched to in
+    the scope (also for a method mismatch, 405), so no re-matching is needed.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope.get("method", "")
+        if method not in HTTP_METHODS:
+            method = "OTHER"
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            route = route_template(scope)
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=str(status["code"]))
@@ -0,0 +1,99 @@
+"""
+Instrumented connection pools
+
+QueuePool subclasses that time every checkout (including any wait for a free
+connection) so pool pressure can be observed and workers sized against
+Postgres ``max_connections``.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class CheckoutStats:
+    """Running totals for pool checkouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            if wait_seconds > self.max_wait_seconds:
+                self.max_wait_seconds = wait_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.total_wait_seconds, 6),
+                "wait_seconds_avg": round(self.total_wait_seconds / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.max_wait_seconds, 6),
+            }
+
+
+class _CheckoutTimingMixin:
+    """Times Pool.connect(): queue wait + new connection + pre-ping"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.checkout_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # Keep counters across pool recreation (e.g. engine.dispose())
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool for the sync engine with checkout timing"""
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool for the async engine with checkout timing"""
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """
+    Gauges and checkout counters for an engine's pool
+
+    Accepts a sync Engine or an AsyncEngine.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    checkout_stats = getattr(pool, "checkout_stats", None)
+    if checkout_stats is not None:
+        stats.update(checkout_stats.snapshot())
+    return stats
@@ -0,0 +1,154 @@
+"""
+Per-request SQL instrumentation
+
+The engine event hooks in core.database time every statement and report it
+here. Statements are attributed to the HTTP request that issued them through
+a context variable set by QueryStatsMiddleware (the async engine runs its
+sync code in greenlets that share the request's context, so both engines are
+covered). For every request:
+
+- a ``Server-Timing`` header carries the statement count, total DB time and
+  slowest statement time (visible in the browser's network panel)
+- statements slower than SLOW_QUERY_THRESHOLD_MS are logged as one JSON line
+  with a normalized fingerprint, so repeats of the same query group together
+  whatever their parameters
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import re
+import time
+
+from .config import settings
+
+logger = logging.getLogger("app.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\([^)]+\)s|%s|\$\d+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement: str) -> str:
+    """
+    Normalize a statement so executions with different values compare equal
+
+    Literals and bind parameters (psycopg2 and asyncpg styles) become ``?``,
+    IN / VALUES lists collapse to one placeholder and whitespace is squeezed.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?)", normalized)
+    normalized = _ROW_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    """Short stable id for a fingerprint (for grouping log lines)"""
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+
+class RequestQueryStats:
+    """Statements executed on behalf of one request"""
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self, total_seconds: Optional[float] = None) -> str:
+        """Server-Timing header value (durations in milliseconds)"""
+        metrics = [
+            f'db;desc="{self.statements} statements";dur={self.db_seconds * 1000:.2f}',
+            f'db-slowest;dur={self.slowest_seconds * 1000:.2f}',
+        ]
+        if total_seconds is not None:
+            metrics.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """Stats of the request being handled (None outside a request)"""
+    return _current_stats.get()
+
+
+def record_statement(statement: str, seconds: float) -> None:
+    """
+    Attribute one executed statement to the current request
+
+    Called from the engine's after_cursor_execute hook. Statements at or
+    above SLOW_QUERY_THRESHOLD_MS are logged (a threshold below 0 disables
+    the log).
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+
+    threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    duration_ms = seconds * 1000
+    if threshold_ms >= 0 and duration_ms >= threshold_ms:
+        fingerprint = fingerprint_statement(statement)
+        entry: Dict[str, Any] = {
+            "event": "slow_query",
+            "duration_ms": round(duration_ms, 2),
+            "threshold_ms": threshold_ms,
+            "fingerprint_id": fingerprint_id(fingerprint),
+            "fingerprint": fingerprint,
+        }
+        if stats is not None:
+            entry["method"] = stats.method
+            entry["path"] = stats.path
+        logger.warning(json.dumps(entry))
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that collects SQL stats per HTTP request
+
+    Adds the Server-Timing header when SERVER_TIMING_ENABLED. Headers are
+    sent before a streaming body, so statements issued while streaming
+    (exports) are counted in the slow-query log but not in the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope.get("method", ""), scope.get("path", ""))
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_ENABLED:
+                headers: List[Tuple[bytes, bytes]] = list(message.get("headers", []))
+                value = stats.server_timing(time.perf_counter() - start)
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
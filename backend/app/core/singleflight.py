@@ -0,0 +1,120 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls with the same key share one execution: the first caller
+runs the work, later callers await its result instead of running their own
+copy. Results are also kept for a short TTL, so a burst of identical
+requests (e.g. everyone opening the default dashboard view at shift change)
+costs one round of queries.
+
+Keys should include a data version so a kept result is never served after
+the data it was computed from has changed. In-process only: each worker
+coalesces its own requests.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import time
+
+from .config import settings
+
+
+class SingleFlight:
+    """Share in-flight and recently finished results per key"""
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, "asyncio.Future"] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Calls that ran the work / joined an in-flight call / reused a kept result
+        self.executions = 0
+        self.shared = 0
+        self.hits = 0
+
+    def _get_result(self, key: str) -> Optional[Tuple[Any]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return (result,)
+
+    def _set_result(self, key: str, result: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return work()'s result, sharing it with concurrent calls for the key
+
+        Exceptions are shared with the callers waiting on the same execution
+        but never kept. If the caller running the work is cancelled, the
+        waiting callers run it themselves.
+        """
+        kept = self._get_result(key)
+        if kept is not None:
+            self.hits += 1
+            return kept[0]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This caller was cancelled, not the shared execution
+                    raise
+            return await work()
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.executions += 1
+        try:
+            result = await work()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved: nobody may be waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._set_result(key, result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.executions + self.shared + self.hits
+        return {
+            "executions": self.executions,
+            "shared": self.shared,
+            "hits": self.hits,
+            "coalesced_ratio": round((self.shared + self.hits) / calls, 4) if calls else 0.0,
+            "in_flight": len(self._in_flight),
+            "entries": len(self._results),
+        }
+
+
+# Paginated patient lists, keyed by normalized parameters + list version
+# (see services.patients)
+patient_list_flight = SingleFlight(
+    "patient-list",
+    ttl_seconds=settings.LIST_COALESCE_TTL_SECONDS,
+    max_entries=settings.LIST_COALESCE_MAX_ENTRIES,
+)
@@ -0,0 +1,139 @@
+"""
+Startup profiling (STARTUP_PROFILE=true)
+
+Times every module imported after start() (self and cumulative time, like
+``python -X importtime``) and the named startup phases, and logs a report
+once startup completes:
+    STARTUP_PROFILE=true uvicorn app.main:app
+
+When the flag is off, start(), phase() and report() do nothing.
+"""
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import sys
+import threading
+import time
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module (the module body)"""
+
+    def __init__(self, loader, profiler: "StartupProfiler", name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        return create_module(spec) if create_module else None
+
+    def exec_module(self, module):
+        # Hand the module its real loader (importlib.resources and friends use it)
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class StartupProfiler(MetaPathFinder):
+    """Import-time and startup-phase timer"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started_at: Optional[float] = None
+        self.imports: List[Tuple[str, float, float]] = []  # (module, self seconds, cumulative seconds)
+        self.phases: Dict[str, float] = {}
+        # Time in outermost imports (nested imports are already included)
+        self.import_seconds = 0.0
+        self._local = threading.local()
+
+    def start(self) -> None:
+        """Begin timing imports (call before the imports to measure)"""
+        if not self.enabled or self.started_at is not None:
+            return
+        self.started_at = time.perf_counter()
+        sys.meta_path.insert(0, self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    def _stack(self) -> List[List[float]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self) -> None:
+        # [start, time spent in nested imports]
+        self._stack().append([time.perf_counter(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        stack = self._stack()
+        start, children = stack.pop()
+        cumulative = time.perf_counter() - start
+        if stack:
+            stack[-1][1] += cumulative
+        else:
+            self.import_seconds += cumulative
+        self.imports.append((name, cumulative - children, cumulative))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a named startup step"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark(self, name: str) -> None:
+        """Record the time since start() as a phase (e.g. "app imported")"""
+        if self.enabled and self.started_at is not None:
+            self.phases[name] = time.perf_counter() - self.started_at
+
+    def report(self, top: int = 25) -> None:
+        """Log phase times and the slowest imports, then stop timing imports"""
+        if not self.enabled or self.started_at is None:
+            return
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        total = time.perf_counter() - self.started_at
+        lines = [
+            f"Startup profile: {total * 1000:.1f} ms to ready, "
+            f"{self.import_seconds * 1000:.1f} ms importing {len(self.imports)} modules"
+        ]
+        for name, seconds in self.phases.items():
+            lines.append(f"  phase {name:<24} {seconds * 1000:9.1f} ms")
+        lines.append(f"  {'self ms':>9} {'cumulative ms':>14}  module (slowest {top})")
+        for name, self_seconds, cumulative in sorted(self.imports, key=lambda entry: entry[2], reverse=True)[:top]:
+            lines.append(f"  {self_seconds * 1000:9.1f} {cumulative * 1000:14.1f}  {name}")
+        logger.info("\n".join(lines))
+
+
+startup_profile = StartupProfiler(settings.STARTUP_PROFILE)
@@ -1,6 +1,10 @@
 """
 Script to generate 1500 sample patients for testing
 Run with Docker: docker compose run --rm api python -m app.generate_data
+
+For load testing at scale use the fast mode (seeded, multi-process, COPY):
+    python -m app.generate_data 5000000 --fast --seed 42 --workers 8
+See generate_data_fast for options and distribution profiles.
 """
 import random
 from datetime import date, timedelta
@@ -8,11 +12,10 @@ from faker import Faker
 from sqlalchemy.orm import Session
 import uuid
 
-from .core.database import SessionLocal, engine, Base
+from .core.database import SessionLocal
 from . import models
-
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+from .migrations import migrate
+from .services.stats import reconcile_patient_stats
 
 fake = Faker()
 
@@ -241,6 +244,9 @@ def generate_patients(count: int = 1500):
             db.commit()
             print(f"✓ Committed batch {i//batch_size + 1}")
         
+        # Generated rows bypass the write-path deltas: rebuild the dashboard stats
+        reconcile_patient_stats(db)
+        
         final_count = db.query(models.Patient).count()
         print(f"\n✅ Successfully generated {final_count} total patients!")
         
@@ -253,7 +259,43 @@ def generate_patients(count: int = 1500):
 
 
 if __name__ == "__main__":
-    import sys
-    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
-    generate_patients(count)
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(description="Generate sample patients")
+    parser.add_argument("count", nargs="?", type=int, default=1500, help="Number of patients (default 1500)")
+    parser.add_argument("--fast", action="store_true", help="Seeded multi-process generator loading via COPY")
+    fast_options = parser.add_argument_group("fast mode")
+    fast_options.add_argument("--seed", type=int, default=42, help="RNG seed (default 42)")
+    fast_options.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    fast_options.add_argument("--batch-size", type=int, default=10000, help="Patients per COPY transaction (default 10000)")
+    fast_options.add_argument("--start", type=int, default=1, help="First patient number, embedded in emails (default 1)")
+    fast_options.add_argument("--as-of", type=date.fromisoformat, default=None, help="Reference date YYYY-MM-DD (default today)")
+    fast_options.add_argument("--profile", default=None, help="JSON file with distribution overrides")
+    fast_options.add_argument("--output-dir", default=None, help="Write COPY files here instead of loading the database")
+    args = parser.parse_args()
+    
+    if not args.output_dir:
+        # Bring an empty or older database up to the current schema first
+        migrate()
+    
+    if args.fast:
+        from .generate_data_fast import generate_patients_fast
+        
+        profile = None
+        if args.profile:
+            with open(args.profile, encoding="utf-8") as f:
+                profile = json.load(f)
+        generate_patients_fast(
+            args.count,
+            seed=args.seed,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            start=args.start,
+            as_of=args.as_of,
+            profile=profile,
+            output_dir=args.output_dir,
+        )
+    else:
+        generate_patients(args.count)
 
@@ -0,0 +1,429 @@
+"""
+Fast synthetic data generator for load testing at scale
+
+Used by ``python -m app.generate_data <count> --fast``. Instead of Faker
+calls and ORM adds per row, rows are built in columnar batches from a seeded
+RNG, batches fan out over a process pool, and each worker streams its
+batches into Postgres with COPY.
+
+Output is deterministic for a given seed, start number and reference date
+(--as-of): every block of BLOCK_SIZE patients draws from its own RNG derived
+from (seed, block number), and the name/address pools come from a Faker
+seeded with the same seed, so worker count and batch size do not change the
+generated rows.
+
+Per-patient distributions default to the same ranges as the default
+generator and can be overridden with a JSON profile (--profile):
+
+    {
+      "conditions": {"counts": {"0": 30, "1": 40, "2": 20, "3": 10},
+                     "weights": {"Hypertension": 5, "Type 2 Diabetes": 3}},
+      "medications": {"counts": {"0": 50, "1": 30, "2": 20}},
+      "documents": {"counts": {"0": 10, "1": 50, "2": 40}}
+    }
+
+"counts" maps items-per-patient to relative frequency; "weights" sets the
+relative popularity of pool items (missing items keep weight 1). Supported
+keys: allergies, conditions, medications, documents.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import io
+import json
+import os
+import random
+import time
+import uuid
+
+from faker import Faker
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from .core.config import settings
+from .services.stats import reconcile_patient_stats
+from .generate_data import (
+    ALLERGIES_POOL,
+    BLOOD_TYPES,
+    CONDITIONS_POOL,
+    DOCUMENT_TYPES,
+    INSURANCE_PROVIDERS,
+    MEDICATIONS_POOL,
+    MIME_TYPES,
+    RELATIONSHIP_TYPES,
+    STATUSES,
+)
+
+# Rows per RNG stream; the unit of determinism
+BLOCK_SIZE = 1000
+
+# Distinct Faker values per pool (names, streets, cities, ...)
+POOL_SIZE = 2000
+
+PATIENT_COLUMNS = (
+    "id", "first_name", "last_name", "date_of_birth", "email", "phone",
+    "address_street", "address_city", "address_state", "address_zip_code", "address_country",
+    "emergency_contact_name", "emergency_contact_relationship",
+    "emergency_contact_phone", "emergency_contact_email",
+    "allergies", "conditions", "blood_type", "last_visit", "status",
+    "insurance_provider", "insurance_policy_number", "insurance_group_number",
+    "insurance_effective_date", "insurance_expiration_date",
+    "insurance_copay", "insurance_deductible",
+)
+MEDICATION_COLUMNS = (
+    "id", "patient_id", "name", "dosage", "frequency", "prescribed_by",
+    "start_date", "end_date", "is_active",
+)
+DOCUMENT_COLUMNS = (
+    "id", "patient_id", "type", "name", "upload_date", "file_size", "mime_type", "url",
+)
+
+MEDICATIONS_BY_NAME = {name: (name, dosage, frequency) for name, dosage, frequency in MEDICATIONS_POOL}
+
+# Same ranges as generate_patient: 0-3 allergies/conditions/medications, 0-5 documents
+DEFAULT_DISTRIBUTIONS = {
+    "allergies": {"counts": {0: 1, 1: 1, 2: 1, 3: 1}},
+    "conditions": {"counts": {0: 1, 1: 1, 2: 1, 3: 1}},
+    "medications": {"counts": {0: 1, 1: 1, 2: 1, 3: 1}},
+    "documents": {"counts": {0: 1, 1: 1, 2: 1, 3: 1, 4: 1, 5: 1}},
+}
+
+ITEM_POOLS = {
+    "allergies": ALLERGIES_POOL,
+    "conditions": CONDITIONS_POOL,
+    "medications": list(MEDICATIONS_BY_NAME),
+    "documents": DOCUMENT_TYPES,
+}
+
+
+class Distribution:
+    """How many items a patient gets, and which ones"""
+
+    def __init__(self, pool: Sequence[str], counts: Dict[Any, float], weights: Optional[Dict[str, float]] = None, distinct: bool = True):
+        unknown = set(weights or {}) - set(pool)
+        if unknown:
+            raise ValueError(f"Unknown items in weights: {', '.join(sorted(unknown))}")
+        self.pool = list(pool)
+        self.count_values = [int(count) for count in counts]
+        self.count_weights = [float(weight) for weight in counts.values()]
+        self.item_weights = [float((weights or {}).get(item, 1.0)) for item in self.pool]
+        # Documents may repeat a type; list items (allergies, ...) may not
+        self.distinct = distinct
+
+    def sample_counts(self, rng: random.Random, n: int) -> List[int]:
+        return rng.choices(self.count_values, self.count_weights, k=n)
+
+    def sample_items(self, rng: random.Random, k: int) -> List[str]:
+        if k <= 0:
+            return []
+        if not self.distinct:
+            return rng.choices(self.pool, self.item_weights, k=k)
+        # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+        keyed = sorted(
+            ((rng.random() ** (1.0 / weight) if weight > 0 else -1.0, item)
+             for item, weight in zip(self.pool, self.item_weights)),
+            reverse=True,
+        )
+        return [item for key, item in keyed[:k] if key >= 0]
+
+
+def load_distributions(profile: Optional[Dict[str, Any]] = None) -> Dict[str, Distribution]:
+    """Merge a profile over DEFAULT_DISTRIBUTIONS (raises ValueError when invalid)"""
+    profile = profile or {}
+    unknown = set(profile) - set(DEFAULT_DISTRIBUTIONS)
+    if unknown:
+        raise ValueError(f"Unknown distribution keys: {', '.join(sorted(unknown))}")
+    distributions = {}
+    for key, default in DEFAULT_DISTRIBUTIONS.items():
+        spec = profile.get(key, {})
+        distributions[key] = Distribution(
+            ITEM_POOLS[key],
+            spec.get("counts", default["counts"]),
+            spec.get("weights"),
+            distinct=key != "documents",
+        )
+    return distributions
+
+
+def build_pools(seed: int) -> Dict[str, List[str]]:
+    """Faker-generated value pools, deterministic for the seed"""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {
+        "first_names": [fake.first_name() for _ in range(POOL_SIZE)],
+        "last_names": [fake.last_name() for _ in range(POOL_SIZE)],
+        "streets": [fake.street_address() for _ in range(POOL_SIZE)],
+        "cities": [fake.city() for _ in range(POOL_SIZE)],
+        "states": [fake.state_abbr() for _ in range(POOL_SIZE)],
+        "zip_codes": [fake.zipcode() for _ in range(POOL_SIZE)],
+        "words": [fake.word().capitalize() for _ in range(POOL_SIZE)],
+    }
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _phone(rng: random.Random) -> str:
+    return f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+
+
+def generate_block(
+    block: int,
+    first_number: int,
+    count: int,
+    seed: int,
+    as_of: date,
+    pools: Dict[str, List[str]],
+    distributions: Dict[str, Distribution],
+) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """
+    Build one block of patients with their medications and documents
+
+    Patient numbers (used in emails) run from first_number. Returns
+    (patient rows, medication rows, document rows) in *_COLUMNS order.
+    """
+    rng = random.Random(f"{seed}:{block}")
+    n = count
+
+    # Patient columns, drawn column by column
+    ids = [_uuid(rng) for _ in range(n)]
+    first_names = rng.choices(pools["first_names"], k=n)
+    last_names = rng.choices(pools["last_names"], k=n)
+    dobs = [as_of - timedelta(days=rng.randint(18 * 365, 90 * 365)) for _ in range(n)]
+    emails = [
+        f"{first.lower()}.{last.lower()}{first_number + i}@example.com"
+        for i, (first, last) in enumerate(zip(first_names, last_names))
+    ]
+    phones = [_phone(rng) for _ in range(n)]
+    streets = rng.choices(pools["streets"], k=n)
+    cities = rng.choices(pools["cities"], k=n)
+    states = rng.choices(pools["states"], k=n)
+    zip_codes = rng.choices(pools["zip_codes"], k=n)
+    emergency_names = [
+        f"{first} {last}"
+        for first, last in zip(rng.choices(pools["first_names"], k=n), rng.choices(pools["last_names"], k=n))
+    ]
+    relationships = rng.choices(RELATIONSHIP_TYPES, k=n)
+    emergency_phones = [_phone(rng) for _ in range(n)]
+    emergency_emails = [
+        f"{name.lower().replace(' ', '.')}@example.org" if rng.random() > 0.3 else None
+        for name in emergency_names
+    ]
+    allergies = [
+        distributions["allergies"].sample_items(rng, k)
+        for k in distributions["allergies"].sample_counts(rng, n)
+    ]
+    conditions = [
+        distributions["conditions"].sample_items(rng, k)
+        for k in distributions["conditions"].sample_counts(rng, n)
+    ]
+    blood_types = [rng.choice(BLOOD_TYPES) if rng.random() > 0.1 else None for _ in range(n)]
+    last_visits = [
+        as_of - timedelta(days=rng.randint(0, 730)) if rng.random() > 0.05 else None
+        for _ in range(n)
+    ]
+    statuses = rng.choices(STATUSES, k=n)
+    providers = rng.choices(INSURANCE_PROVIDERS, k=n)
+    policies = [f"{provider[:3].upper()}{rng.randint(100000000, 999999999)}" for provider in providers]
+    groups = [f"GRP{rng.randint(100, 999)}" if rng.random() > 0.2 else None for _ in range(n)]
+    effective_dates = [
+        date(2024, 1, 1) if rng.random() > 0.1 else as_of - timedelta(days=rng.randint(0, 730))
+        for _ in range(n)
+    ]
+    expiration_dates = [
+        date(2024, 12, 31) if rng.random() > 0.1 else as_of + timedelta(days=rng.randint(0, 365))
+        for _ in range(n)
+    ]
+    copays = rng.choices([10.0, 15.0, 20.0, 25.0, 30.0, 50.0], k=n)
+    deductibles = rng.choices([500.0, 1000.0, 1500.0, 2000.0, 2500.0, 5000.0], k=n)
+
+    patients = list(zip(
+        ids, first_names, last_names, dobs, emails, phones,
+        streets, cities, states, zip_codes, ["USA"] * n,
+        emergency_names, relationships, emergency_phones, emergency_emails,
+        allergies, conditions, blood_types, last_visits, statuses,
+        providers, policies, groups, effective_dates, expiration_dates,
+        copays, deductibles,
+    ))
+
+    # Child rows
+    medications = []
+    for patient_id, k in zip(ids, distributions["medications"].sample_counts(rng, n)):
+        for med_name in distributions["medications"].sample_items(rng, k):
+            _, dosage, frequency = MEDICATIONS_BY_NAME[med_name]
+            start_date = as_of - timedelta(days=rng.randint(0, 365))
+            end_date = None if rng.random() > 0.3 else as_of + timedelta(days=rng.randint(0, 365))
+            medications.append((
+                _uuid(rng), patient_id, med_name, dosage, frequency,
+                f"Dr. {rng.choice(pools['last_names'])}",
+                start_date, end_date, end_date is None or end_date > as_of,
+            ))
+
+    documents = []
+    for patient_id, k in zip(ids, distributions["documents"].sample_counts(rng, n)):
+        for doc_type in distributions["documents"].sample_items(rng, k):
+            mime_type = rng.choice(MIME_TYPES)
+            documents.append((
+                _uuid(rng), patient_id, doc_type,
+                f"{doc_type.replace('_', ' ').title()} - {rng.choice(pools['words'])}",
+                as_of - timedelta(days=rng.randint(0, 730)),
+                rng.randint(50000, 5000000),
+                mime_type,
+                f"/documents/{patient_id}/{_uuid(rng)}.{mime_type.split('/')[-1]}",
+            ))
+
+    return patients, medications, documents
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, list):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def encode_copy_rows(rows: Sequence[tuple]) -> str:
+    """Encode rows in COPY text format (tab-separated, \\N for NULL)"""
+    return "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+
+
+# Per-process state, set by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(seed: int, as_of: date, profile: Optional[Dict[str, Any]], output_dir: Optional[str]):
+    _worker.update(
+        seed=seed,
+        as_of=as_of,
+        pools=build_pools(seed),
+        distributions=load_distributions(profile),
+        output_dir=output_dir,
+        # One short-lived connection per batch; no pool to share across forks
+        engine=None if output_dir else create_engine(settings.DATABASE_URL, poolclass=NullPool),
+    )
+
+
+def _run_batch(batch: int, first_block: int, last_block: int, start: int, total: int) -> Tuple[int, int, int]:
+    """Generate blocks [first_block, last_block) and COPY them in one transaction"""
+    tables = {"patients": [], "medications": [], "documents": []}
+    for block in range(first_block, last_block):
+        offset = block * BLOCK_SIZE
+        count = min(BLOCK_SIZE, total - offset)
+        patients, medications, documents = generate_block(
+            block, start + offset, count, _worker["seed"], _worker["as_of"],
+            _worker["pools"], _worker["distributions"],
+        )
+        tables["patients"].extend(patients)
+        tables["medications"].extend(medications)
+        tables["documents"].extend(documents)
+
+    columns = {"patients": PATIENT_COLUMNS, "medications": MEDICATION_COLUMNS, "documents": DOCUMENT_COLUMNS}
+    if _worker["output_dir"]:
+        for table, rows in tables.items():
+            path = os.path.join(_worker["output_dir"], f"{table}_{batch:06d}.tsv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(encode_copy_rows(rows))
+    else:
+        connection = _worker["engine"].raw_connection()
+        try:
+            cursor = connection.cursor()
+            # Parents first for the foreign keys
+            for table, rows in tables.items():
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns[table])}) FROM STDIN",
+                    io.StringIO(encode_copy_rows(rows)),
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+    return len(tables["patients"]), len(tables["medications"]), len(tables["documents"])
+
+
+def generate_patients_fast(
+    count: int,
+    seed: int = 42,
+    workers: Optional[int] = None,
+    batch_size: int = 10000,
+    start: int = 1,
+    as_of: Optional[date] = None,
+    profile: Optional[Dict[str, Any]] = None,
+    output_dir: Optional[str] = None,
+):
+    """
+    Generate ``count`` patients (see module docstring)
+
+    Args:
+        count: Number of patients
+        seed: RNG seed; the same seed produces the same rows
+        workers: Worker processes (default: CPU count)
+        batch_size: Patients per COPY transaction (rounded to BLOCK_SIZE)
+        start: First patient number (emails embed it, so use a fresh range
+            when adding to existing data)
+        as_of: Reference date for visit/medication dates (default: today)
+        profile: Distribution overrides
+        output_dir: Write COPY-format .tsv files here instead of loading them
+    """
+    as_of = as_of or date.today()
+    workers = workers or os.cpu_count() or 1
+    load_distributions(profile)  # fail fast on a bad profile
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    blocks = (count + BLOCK_SIZE - 1) // BLOCK_SIZE
+    blocks_per_batch = max(1, batch_size // BLOCK_SIZE)
+    batches = [
+        (batch, first_block, min(first_block + blocks_per_batch, blocks))
+        for batch, first_block in enumerate(range(0, blocks, blocks_per_batch))
+    ]
+
+    print(f"Generating {count} patients (seed={seed}, workers={workers}, {len(batches)} batches)...")
+    started = time.perf_counter()
+    totals = [0, 0, 0]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(seed, as_of, profile, output_dir),
+    ) as executor:
+        futures = [
+            executor.submit(_run_batch, batch, first_block, last_block, start, count)
+            for batch, first_block, last_block in batches
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            for i, value in enumerate(future.result()):
+                totals[i] += value
+            elapsed = time.perf_counter() - started
+            print(f"✓ Batch {done}/{len(batches)} - {totals[0]} patients ({totals[0] / elapsed:,.0f}/s)")
+
+    if not output_dir:
+        # Fresh statistics for the planner (and the estimated list totals)
+        engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+        with engine.connect() as connection:
+            connection.execute(text("ANALYZE patients"))
+            connection.execute(text("ANALYZE medications"))
+            connection.execute(text("ANALYZE documents"))
+            connection.commit()
+        # COPY bypasses the write-path deltas: rebuild the dashboard stats
+        with Session(engine) as db:
+            reconcile_patient_stats(db)
+        engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n✅ Generated {totals[0]} patients, {totals[1]} medications and "
+        f"{totals[2]} documents in {elapsed:.1f}s"
+    )
+    return {"patients": totals[0], "medications": totals[1], "documents": totals[2], "seconds": round(elapsed, 2)}
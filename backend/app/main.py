@@ -1,6 +1,12 @@
 """
 Main FastAPI application
 """
+from .core.startup_profile import startup_profile
+
+# Time the imports below when STARTUP_PROFILE is set
+startup_profile.start()
+
+import asyncio
 import logging
 import sys
 
@@ -8,9 +14,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
-from .core.database import engine, SessionLocal
+from .core.database import SessionLocal, AsyncSessionLocal, dispose_engines
+from .core.metrics import MetricsMiddleware
+from .core.query_stats import QueryStatsMiddleware
 from . import models
+from .migrations import verify_schema_version
 from .api.v1.api import api_router
+from .services.stats import run_stats_reconciler
+from .services.totals import estimate_table_rows
 
 # Configure logging
 logging.basicConfig(
@@ -20,9 +31,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 # Create FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
@@ -43,6 +51,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Per-request SQL stats (Server-Timing header, slow-query log)
+app.add_middleware(QueryStatsMiddleware)
+
+# Request latency / in-flight metrics for GET /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 # Using root prefix for backward compatibility with frontend
 app.include_router(api_router, prefix="")
@@ -53,15 +67,53 @@ async def root():
     return {"message": "Healthcare Dashboard API"}
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Log database status on startup"""
-    logger.info(f"CORS origins configured: {settings.CORS_ORIGINS}")
+startup_profile.mark("app imported")
+
+
+def log_patient_count() -> None:
+    """Log the patient count as configured by STARTUP_PATIENT_COUNT"""
+    mode = settings.STARTUP_PATIENT_COUNT
+    if mode == "none":
+        return
     db = SessionLocal()
     try:
-        patient_count = db.query(models.Patient).count()
-        logger.info(f"Database contains {patient_count} patients.")
+        if mode == "exact":
+            patient_count = db.query(models.Patient).count()
+            logger.info(f"Database contains {patient_count} patients.")
+        else:
+            # Planner statistics: no table scan, so fine on any table size
+            patient_count = estimate_table_rows(db, "patients")
+            if patient_count is None:
+                logger.info("Patient count unknown (table not analyzed yet).")
+                return
+            logger.info(f"Database contains about {patient_count} patients (planner estimate).")
         if patient_count == 0:
             logger.info("Database is empty. To generate patients, run: docker compose run --rm api python -m app.generate_data")
     finally:
         db.close()
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Check the schema version and log database status on startup"""
+    logger.info(f"CORS origins configured: {settings.CORS_ORIGINS}")
+    # Schema changes are applied by `python -m app.migrations`, never here
+    with startup_profile.phase("schema check"):
+        schema_version = verify_schema_version()
+    logger.info(f"Database schema at version {schema_version}")
+    with startup_profile.phase("patient count"):
+        log_patient_count()
+    
+    # Rebuild the dashboard stats now (STATS_RECONCILE_ON_STARTUP), then every
+    # STATS_RECONCILE_SECONDS
+    app.state.stats_reconciler = asyncio.create_task(run_stats_reconciler(AsyncSessionLocal))
+    startup_profile.report()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and close pooled connections"""
+    reconciler = getattr(app.state, "stats_reconciler", None)
+    if reconciler:
+        reconciler.cancel()
+    await dispose_engines()
@@ -0,0 +1,231 @@
+"""
+Versioned schema migrations
+
+The schema version lives in the schema_migrations table (one row per
+applied migration). Migrations run in order, once, from a deploy step:
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations --status   # current and required version
+
+Application workers never change the schema: startup only checks that the
+database is at SCHEMA_VERSION or later (verify_schema_version).
+
+Index migrations build with CREATE INDEX CONCURRENTLY so reads and writes
+on the table keep going while the index is built. Those statements cannot
+run inside a transaction, so such migrations run in autocommit mode and must
+be idempotent (IF NOT EXISTS): an interrupted build is retried on the next
+run, after dropping the INVALID index it left behind.
+
+Adding a migration: append to MIGRATIONS with the next version number and
+keep models.py in step (fresh databases get the current models from the
+baseline, so later migrations find their objects already present).
+"""
+from typing import Callable, List, Optional, Sequence
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .core.database import Base, get_engine
+from . import models  # noqa: F401 - registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key: one migration run at a time across deploys
+MIGRATION_LOCK_KEY = 7_301_023
+
+
+class Migration:
+    """One schema change: apply(connection) runs once, recorded under version"""
+
+    def __init__(self, version: int, description: str, apply: Callable[[Connection], None], transactional: bool = True):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        # False for CREATE INDEX CONCURRENTLY and friends (autocommit, idempotent)
+        self.transactional = transactional
+
+
+def create_index_concurrently(conn: Connection, name: str, definition: str) -> None:
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS name <definition>
+
+    A failed or cancelled concurrent build leaves an INVALID index that
+    IF NOT EXISTS would skip, so that is dropped and rebuilt.
+    """
+    valid = conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {"name": name},
+    ).scalar()
+    if valid is False:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    start = time.perf_counter()
+    conn.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+    logger.info(f"Index {name} ready ({time.perf_counter() - start:.1f}s)")
+
+
+def create_indexes_concurrently(indexes: Sequence[Sequence[str]]) -> Callable[[Connection], None]:
+    """Migration body building each (name, definition) in turn"""
+    def apply(conn: Connection) -> None:
+        for name, definition in indexes:
+            create_index_concurrently(conn, name, definition)
+    return apply
+
+
+def _create_tables(*tables) -> Callable[[Connection], None]:
+    """Migration body creating new tables from their models (if not present)"""
+    def apply(conn: Connection) -> None:
+        Base.metadata.create_all(bind=conn, tables=[table.__table__ for table in tables])
+    return apply
+
+
+def _baseline(conn: Connection) -> None:
+    # Tables that don't exist yet, with their indexes (existing tables are
+    # left alone - databases created before migrations get their indexes
+    # from version 2)
+    conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    Base.metadata.create_all(bind=conn)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline tables", _baseline),
+    Migration(2, "Sort, ETag, JSONB and search indexes on existing tables", create_indexes_concurrently([
+        ("ix_patients_first_name_id", "ON patients (first_name, id)"),
+        ("ix_patients_last_name_id", "ON patients (last_name, id)"),
+        ("ix_patients_date_of_birth_id", "ON patients (date_of_birth, id)"),
+        ("ix_patients_created_at_id", "ON patients (created_at, id)"),
+        ("ix_patients_status_id", "ON patients (status, id)"),
+        ("ix_patients_insurance_provider_id", "ON patients (insurance_provider, id)"),
+        ("ix_patients_updated_at", "ON patients (updated_at)"),
+        ("ix_patients_allergies_gin", "ON patients USING gin (allergies)"),
+        ("ix_patients_conditions_gin", "ON patients USING gin (conditions)"),
+        ("ix_patients_search_name_trgm", "ON patients USING gin (lower(first_name || ' ' || last_name) gin_trgm_ops)"),
+        ("ix_patients_search_email_trgm", "ON patients USING gin (lower(email) gin_trgm_ops)"),
+        ("ix_patients_search_phone_trgm", "ON patients USING gin (regexp_replace(phone, '[^0-9]', '', 'g') gin_trgm_ops)"),
+        ("ix_medications_active_patient_name", "ON medications (patient_id, lower(name)) WHERE is_active"),
+    ]), transactional=False),
+    Migration(3, "Indexes for the blood type, city, state, provider and last visit filters", create_indexes_concurrently([
+        ("ix_patients_blood_type_id", "ON patients (blood_type, id)"),
+        ("ix_patients_last_visit", "ON patients (last_visit)"),
+        ("ix_patients_address_city_trgm", "ON patients USING gin (address_city gin_trgm_ops)"),
+        ("ix_patients_address_state_trgm", "ON patients USING gin (address_state gin_trgm_ops)"),
+        ("ix_patients_insurance_provider_trgm", "ON patients USING gin (insurance_provider gin_trgm_ops)"),
+    ]), transactional=False),
+    # models.py declares these (patient_id index=True); databases whose
+    # tables predate that only get them here
+    Migration(4, "Patient foreign key indexes on medications and documents", create_indexes_concurrently([
+        ("ix_medications_patient_id", "ON medications (patient_id)"),
+        ("ix_documents_patient_id", "ON documents (patient_id)"),
+    ]), transactional=False),
+    Migration(5, "Last patient_stats reconciliation time", _create_tables(models.PatientStatsReconciliation)),
+]
+
+# Version this code expects the database to be at
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description TEXT NOT NULL, "
+        "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    )
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+        {"version": migration.version, "description": migration.description},
+    )
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    """Applied migration versions, ascending ([] before the first migration)"""
+    if conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar() is None:
+        return []
+    return list(conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars())
+
+
+def current_version(conn: Connection) -> Optional[int]:
+    """Highest applied version (None for an unversioned database)"""
+    versions = applied_versions(conn)
+    return versions[-1] if versions else None
+
+
+def migrate(bind: Optional[Engine] = None) -> List[int]:
+    """
+    Apply pending migrations in order and return the versions applied
+
+    Holds a session advisory lock for the whole run, so concurrent deploys
+    wait for each other instead of racing.
+    """
+    bind = bind if bind is not None else get_engine()
+    applied: List[int] = []
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            _ensure_version_table(lock_conn)
+            done = set(applied_versions(lock_conn))
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                logger.info(f"Applying migration {migration.version}: {migration.description}")
+                start = time.perf_counter()
+                if migration.transactional:
+                    with bind.begin() as conn:
+                        migration.apply(conn)
+                        _record(conn, migration)
+                else:
+                    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        migration.apply(conn)
+                        _record(conn, migration)
+                logger.info(f"Migration {migration.version} applied ({time.perf_counter() - start:.1f}s)")
+                applied.append(migration.version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    return applied
+
+
+def verify_schema_version(bind: Optional[Engine] = None) -> int:
+    """
+    Check the database is at SCHEMA_VERSION or later; return its version
+
+    A single query, run at worker startup instead of create_all. A newer
+    database is fine (old workers during a rolling deploy); an older one
+    raises RuntimeError.
+    """
+    bind = bind if bind is not None else get_engine()
+    with bind.connect() as conn:
+        version = current_version(conn)
+    if version is None or version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version or 0}, this code needs {SCHEMA_VERSION}. "
+            "Run: python -m app.migrations"
+        )
+    if version > SCHEMA_VERSION:
+        logger.info(f"Database schema version {version} is ahead of this code ({SCHEMA_VERSION})")
+    return version
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show the current and required version and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        with get_engine().connect() as conn:
+            versions = applied_versions(conn)
+        pending = [m for m in MIGRATIONS if m.version not in versions]
+        print(f"Current version: {versions[-1] if versions else 0}, required: {SCHEMA_VERSION}")
+        for migration in pending:
+            print(f"  pending {migration.version}: {migration.description}")
+    else:
+        applied = migrate()
+        print(f"Applied {len(applied)} migration(s); schema at version {SCHEMA_VERSION}")
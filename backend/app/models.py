@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Text, Boolean, DateTime, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Text, Boolean, DateTime, Enum as SQLEnum, UniqueConstraint, Index, DDL, event, literal_column
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -30,10 +30,30 @@ class DocumentType(str, Enum):
     TEST_RESULT = "test_result"
     OTHER = "other"
 
+# Indexes are created by migrations (app.migrations); add new ones there too
 class Patient(Base):
     __tablename__ = "patients"
     __table_args__ = (
         UniqueConstraint('email', name='unique_patient_email'),
+        # Composite (sort column, id) indexes for list sorting and keyset pagination
+        Index('ix_patients_first_name_id', 'first_name', 'id'),
+        Index('ix_patients_last_name_id', 'last_name', 'id'),
+        Index('ix_patients_date_of_birth_id', 'date_of_birth', 'id'),
+        Index('ix_patients_created_at_id', 'created_at', 'id'),
+        Index('ix_patients_status_id', 'status', 'id'),
+        Index('ix_patients_insurance_provider_id', 'insurance_provider', 'id'),
+        # max(updated_at) versions list responses (ETags)
+        Index('ix_patients_updated_at', 'updated_at'),
+        # GIN indexes (default jsonb_ops) serving ?| / ?& / @> on the JSONB arrays
+        Index('ix_patients_allergies_gin', 'allergies', postgresql_using='gin'),
+        Index('ix_patients_conditions_gin', 'conditions', postgresql_using='gin'),
+        # Filters: blood type equality, last visit ranges, and trigram GIN for
+        # the substring (ILIKE '%term%') city / state / provider filters
+        Index('ix_patients_blood_type_id', 'blood_type', 'id'),
+        Index('ix_patients_last_visit', 'last_visit'),
+        Index('ix_patients_address_city_trgm', 'address_city', postgresql_using='gin', postgresql_ops={'address_city': 'gin_trgm_ops'}),
+        Index('ix_patients_address_state_trgm', 'address_state', postgresql_using='gin', postgresql_ops={'address_state': 'gin_trgm_ops'}),
+        Index('ix_patients_insurance_provider_trgm', 'insurance_provider', postgresql_using='gin', postgresql_ops={'insurance_provider': 'gin_trgm_ops'}),
     )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
@@ -79,11 +99,57 @@ class Patient(Base):
     medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan")
     documents = relationship("Document", back_populates="patient", cascade="all, delete-orphan")
 
+
+# Search expressions
+# The list search filters on exactly these expressions so Postgres can match
+# them to the trigram indexes below. Literals are rendered inline (not bound)
+# because an index expression only matches a query expression with identical
+# constants.
+def search_name_expression():
+    """lower(first_name || ' ' || last_name) - covers first, last and full name"""
+    return func.lower(Patient.first_name + literal_column("' '") + Patient.last_name)
+
+
+def search_email_expression():
+    """lower(email)"""
+    return func.lower(Patient.email)
+
+
+def search_phone_expression():
+    """Phone number with every non-digit stripped"""
+    return func.regexp_replace(
+        Patient.phone, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'")
+    )
+
+
+# pg_trgm provides the gin_trgm_ops operator class used by the search indexes
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+# Trigram GIN indexes serving substring (ILIKE '%term%') search
+Index(
+    'ix_patients_search_name_trgm',
+    search_name_expression().label('search_name'),
+    postgresql_using='gin',
+    postgresql_ops={'search_name': 'gin_trgm_ops'},
+)
+Index(
+    'ix_patients_search_email_trgm',
+    search_email_expression().label('search_email'),
+    postgresql_using='gin',
+    postgresql_ops={'search_email': 'gin_trgm_ops'},
+)
+Index(
+    'ix_patients_search_phone_trgm',
+    search_phone_expression().label('search_phone'),
+    postgresql_using='gin',
+    postgresql_ops={'search_phone': 'gin_trgm_ops'},
+)
+
 class Medication(Base):
     __tablename__ = "medications"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False, index=True)
     
     name = Column(String, nullable=False)
     dosage = Column(String, nullable=False)
@@ -95,11 +161,20 @@ class Medication(Base):
     
     patient = relationship("Patient", back_populates="medications")
 
+
+# Partial index for the active-medication EXISTS filter on the patient list
+Index(
+    'ix_medications_active_patient_name',
+    Medication.patient_id,
+    func.lower(Medication.name),
+    postgresql_where=Medication.is_active,
+)
+
 class Document(Base):
     __tablename__ = "documents"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False, index=True)
     
     type = Column(String, nullable=False)  # medical_record, insurance_card, etc.
     name = Column(String, nullable=False)
@@ -109,3 +184,32 @@ class Document(Base):
     url = Column(String, nullable=False)
     
     patient = relationship("Patient", back_populates="documents")
+
+
+class PatientStat(Base):
+    """
+    Dashboard summary counts (see services.stats)
+    
+    One row per (dimension, value): dimension "total" has a single row,
+    "status" / "insurance_provider" one row per value and "last_visit" one
+    row per visit date. Kept current by write-path deltas and periodically
+    rebuilt from patients.
+    """
+    __tablename__ = "patient_stats"
+    
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)  # '' when the patient has no value
+    count = Column(Integer, nullable=False, default=0)
+
+
+class PatientStatsReconciliation(Base):
+    """
+    When patient_stats was last rebuilt from patients (a single row, id 1)
+    
+    Shared by every worker, so one rebuild per STATS_RECONCILE_SECONDS
+    serves them all (see services.stats.reconcile_patient_stats).
+    """
+    __tablename__ = "patient_stats_reconciliation"
+    
+    id = Column(Integer, primary_key=True)
+    reconciled_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import date, datetime
 
 # Address Schema
@@ -215,6 +215,58 @@ class PaginatedPatients(BaseModel):
     page: int
     pageSize: int = Field(alias="page_size")
     totalPages: int = Field(alias="total_pages")
+    # True when total is a planner estimate rather than an exact COUNT
+    totalIsEstimate: bool = Field(False, alias="totalIsEstimate")
+    # Opaque keyset cursor for the next page (None when there are no more rows)
+    nextCursor: Optional[str] = Field(None, alias="nextCursor")
+    
+    class Config:
+        populate_by_name = True
+
+# Bulk Import Schemas
+class BulkImportError(BaseModel):
+    row: int  # 1-based position in the upload (CSV: data row, header excluded)
+    email: Optional[str] = None
+    errors: List[str]
+    
+    class Config:
+        populate_by_name = True
+
+class BulkImportResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[BulkImportError] = []
+    
+    class Config:
+        populate_by_name = True
+
+# Facet Schemas (filter sidebar counts)
+class FacetCount(BaseModel):
+    value: Optional[str] = None  # None: no value recorded (e.g. unknown blood type)
+    count: int
+
+class PatientFacets(BaseModel):
+    total: int
+    status: List[FacetCount] = []
+    bloodType: List[FacetCount] = Field([], alias="blood_type")
+    insuranceProvider: List[FacetCount] = Field([], alias="insurance_provider")
+    conditions: List[FacetCount] = []
+    allergies: List[FacetCount] = []
+    # Cumulative buckets, same values as the last_visit filter
+    lastVisit: List[FacetCount] = Field([], alias="last_visit")
+    
+    class Config:
+        populate_by_name = True
+
+# Dashboard Statistics Schema
+class PatientStats(BaseModel):
+    total: int
+    byStatus: Dict[str, int] = Field(alias="by_status")
+    byInsuranceProvider: Dict[str, int] = Field(alias="by_insurance_provider")
+    critical: int
+    visitsLast7Days: int = Field(alias="visits_last_7_days")
+    visitsLast30Days: int = Field(alias="visits_last_30_days")
     
     class Config:
         populate_by_name = True
@@ -0,0 +1,347 @@
+"""
+Bulk import service - Create many patients from one upload
+
+Uploads (JSON array, NDJSON or CSV) are handled in two phases:
+
+1. prepare: parse, validate every row with schemas.PatientCreate and drop
+   emails that repeat within the upload or already exist (one set-based
+   query for the whole upload). Pure CPU, run off the event loop.
+2. write: multi-row ``INSERT ... ON CONFLICT (email) DO NOTHING`` for
+   patients, then multi-row INSERTs for their medications, in chunks of
+   BULK_IMPORT_CHUNK_SIZE with one transaction per chunk.
+
+Rejected rows never fail the upload; each one is reported with its position
+and reasons. CSV uses the flat column names of GET /patients/export, so an
+export can be imported again (id / created_at / updated_at are ignored).
+"""
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import csv
+import io
+import logging
+import uuid
+
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import String, any_, insert, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .. import models, schemas
+from ..core.config import settings
+from .patients import patient_create_values
+from .stats import apply_stat_deltas, invalidate_stats_cache, patient_stat_keys
+from .totals import invalidate_patient_totals
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+
+_CONTENT_TYPE_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+_EXTENSION_FORMATS = {
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+# CSV column -> PatientCreate field path
+CSV_FIELDS = {
+    "first_name": ("first_name",),
+    "last_name": ("last_name",),
+    "date_of_birth": ("date_of_birth",),
+    "email": ("email",),
+    "phone": ("phone",),
+    "blood_type": ("blood_type",),
+    "address_street": ("address", "street"),
+    "address_city": ("address", "city"),
+    "address_state": ("address", "state"),
+    "address_zip_code": ("address", "zip_code"),
+    "address_country": ("address", "country"),
+    "emergency_contact_name": ("emergencyContact", "name"),
+    "emergency_contact_relationship": ("emergencyContact", "relationship"),
+    "emergency_contact_phone": ("emergencyContact", "phone"),
+    "emergency_contact_email": ("emergencyContact", "email"),
+    "allergies": ("allergies",),
+    "conditions": ("conditions",),
+    "last_visit": ("last_visit",),
+    "status": ("status",),
+    "insurance_provider": ("insurance", "provider"),
+    "insurance_policy_number": ("insurance", "policy_number"),
+    "insurance_group_number": ("insurance", "group_number"),
+    "insurance_effective_date": ("insurance", "effective_date"),
+    "insurance_expiration_date": ("insurance", "expiration_date"),
+    "insurance_copay": ("insurance", "copay"),
+    "insurance_deductible": ("insurance", "deductible"),
+}
+# CSV list columns hold ";"-separated values (as written by the export)
+CSV_LIST_FIELDS = {"allergies", "conditions"}
+
+
+class UnparsableRecord:
+    """Placeholder for an NDJSON line that is not valid JSON"""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+class PreparedImport:
+    """Validated rows ready to insert, plus the rows already rejected"""
+
+    def __init__(self, received: int):
+        self.received = received
+        # (row, email, patient column values, medication column values)
+        self.rows: List[Tuple[int, str, Dict[str, Any], List[Dict[str, Any]]]] = []
+        self.errors: List[schemas.BulkImportError] = []
+
+    def reject(self, row: int, email: Optional[str], *errors: str) -> None:
+        self.errors.append(schemas.BulkImportError(row=row, email=email, errors=list(errors)))
+
+
+def detect_import_format(content_type: Optional[str], filename: Optional[str] = None) -> str:
+    """
+    Pick the upload format from the file extension or content type
+
+    Raises 415 when neither identifies a supported format.
+    """
+    if filename:
+        for extension, import_format in _EXTENSION_FORMATS.items():
+            if filename.lower().endswith(extension):
+                return import_format
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in _CONTENT_TYPE_FORMATS:
+        return _CONTENT_TYPE_FORMATS[media_type]
+    raise HTTPException(
+        status_code=415,
+        detail="Upload must be application/json (array), application/x-ndjson or text/csv"
+    )
+
+
+def csv_row_to_record(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """
+    Turn a flat CSV row into a nested PatientCreate payload
+
+    Blank cells are left out so schema defaults apply; unknown columns are
+    ignored.
+    """
+    record: Dict[str, Any] = {}
+    for column, path in CSV_FIELDS.items():
+        value = (row.get(column) or "").strip()
+        if not value:
+            continue
+        if column in CSV_LIST_FIELDS:
+            value = [item.strip() for item in value.split(";") if item.strip()]
+        target = record
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return record
+
+
+def parse_import_records(data: bytes, import_format: str) -> List[Any]:
+    """
+    Parse an upload into raw records (dicts, or UnparsableRecord for bad lines)
+
+    Raises 400 for a malformed JSON/CSV document and 413 above
+    BULK_IMPORT_MAX_ROWS records.
+    """
+    if import_format == "json":
+        try:
+            records = orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="JSON upload must be an array of patients")
+    elif import_format == "ndjson":
+        records = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(orjson.loads(line))
+            except orjson.JSONDecodeError as e:
+                records.append(UnparsableRecord(f"Invalid JSON: {e}"))
+    else:
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV upload must be UTF-8 encoded")
+        records = [csv_row_to_record(row) for row in csv.DictReader(io.StringIO(text))]
+
+    if len(records) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload has {len(records)} rows; the limit is {settings.BULK_IMPORT_MAX_ROWS}"
+        )
+    return records
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail["loc"] else detail["msg"]
+        for detail in error.errors()
+    ]
+
+
+def prepare_import(records: Sequence[Any]) -> PreparedImport:
+    """
+    Validate records and dedupe emails within the upload
+
+    Rows are numbered from 1 in upload order. The first row with a given
+    email wins; later ones are rejected.
+    """
+    prepared = PreparedImport(received=len(records))
+    first_seen: Dict[str, int] = {}
+    for row, record in enumerate(records, start=1):
+        if isinstance(record, UnparsableRecord):
+            prepared.reject(row, None, record.message)
+            continue
+        if not isinstance(record, dict):
+            prepared.reject(row, None, "Expected a patient object")
+            continue
+        raw_email = record.get("email")
+        email = raw_email if isinstance(raw_email, str) else None
+        try:
+            patient_data = schemas.PatientCreate.model_validate(record)
+            patient_values, medication_values = patient_create_values(patient_data)
+        except ValidationError as e:
+            prepared.reject(row, email, *_validation_messages(e))
+            continue
+        except ValueError as e:
+            prepared.reject(row, email, f"Invalid date (expected YYYY-MM-DD): {e}")
+            continue
+
+        email = patient_values["email"]
+        if email in first_seen:
+            prepared.reject(row, email, f"Duplicate email in upload (first used in row {first_seen[email]})")
+            continue
+        first_seen[email] = row
+        prepared.rows.append((row, email, patient_values, medication_values))
+    return prepared
+
+
+def existing_emails(db: Session, emails: Sequence[str]) -> Set[str]:
+    """Return which of the given emails already belong to a patient (one query)"""
+    if not emails:
+        return set()
+    statement = select(models.Patient.email).where(
+        models.Patient.email == any_(literal(list(emails), ARRAY(String)))
+    )
+    return set(db.execute(statement).scalars())
+
+
+def _chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_chunk(db: Session, chunk, prepared: PreparedImport) -> int:
+    """Insert one chunk in its own transaction; returns the number created"""
+    patient_rows = []
+    patient_ids = {}
+    for row, email, patient_values, _ in chunk:
+        patient_ids[row] = str(uuid.uuid4())
+        patient_rows.append({"id": patient_ids[row], **patient_values})
+
+    try:
+        # Rows whose email was inserted concurrently are skipped, not failed
+        inserted = set(db.execute(
+            pg_insert(models.Patient)
+            .values(patient_rows)
+            .on_conflict_do_nothing(index_elements=[models.Patient.email])
+            .returning(models.Patient.id)
+        ).scalars())
+
+        medication_rows = [
+            {"id": str(uuid.uuid4()), "patient_id": patient_ids[row], **med_values}
+            for row, _, _, medications in chunk
+            if patient_ids[row] in inserted
+            for med_values in medications
+        ]
+        for medication_chunk in _chunks(medication_rows, settings.BULK_IMPORT_CHUNK_SIZE):
+            db.execute(insert(models.Medication).values(list(medication_chunk)))
+
+        # Dashboard stats deltas for the whole chunk, in the same transaction
+        stat_keys = Counter()
+        for row, _, patient_values, _ in chunk:
+            if patient_ids[row] in inserted:
+                stat_keys.update(patient_stat_keys(
+                    patient_values["status"],
+                    patient_values["insurance_provider"],
+                    patient_values["last_visit"],
+                ))
+        apply_stat_deltas(db, stat_keys)
+
+        db.commit()
+        invalidate_stats_cache()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.exception("Bulk import chunk failed")
+        for row, email, _, _ in chunk:
+            prepared.reject(row, email, f"Database error, chunk not imported: {e.__class__.__name__}")
+        return 0
+
+    for row, email, _, _ in chunk:
+        if patient_ids[row] not in inserted:
+            prepared.reject(row, email, f"Patient with email '{email}' already exists")
+    return len(inserted)
+
+
+def write_import(db: Session, prepared: PreparedImport) -> schemas.BulkImportResult:
+    """
+    Insert the prepared rows and build the report
+
+    Emails already in the database are rejected up front with a single
+    set-based query; the ON CONFLICT clause covers patients created while
+    the import runs.
+    """
+    taken = existing_emails(db, [email for _, email, _, _ in prepared.rows])
+    rows = []
+    for entry in prepared.rows:
+        row, email = entry[0], entry[1]
+        if email in taken:
+            prepared.reject(row, email, f"Patient with email '{email}' already exists")
+        else:
+            rows.append(entry)
+
+    created = 0
+    for chunk in _chunks(rows, settings.BULK_IMPORT_CHUNK_SIZE):
+        created += _insert_chunk(db, chunk, prepared)
+    if created:
+        invalidate_patient_totals()
+
+    errors = sorted(prepared.errors, key=lambda error: error.row)
+    return schemas.BulkImportResult(
+        received=prepared.received,
+        created=created,
+        failed=len(errors),
+        errors=errors,
+    )
+
+
+def import_patients(db: Session, data: bytes, import_format: str) -> schemas.BulkImportResult:
+    """Parse, validate and insert an upload (see module docstring)"""
+    prepared = prepare_import(parse_import_records(data, import_format))
+    return write_import(db, prepared)
+
+
+async def import_patients_async(db: AsyncSession, data: bytes, import_format: str) -> schemas.BulkImportResult:
+    """
+    Async version of import_patients
+
+    Parsing and validation run in the threadpool so large uploads do not
+    stall the event loop; the inserts run on the AsyncSession via run_sync.
+    """
+    records = await run_in_threadpool(parse_import_records, data, import_format)
+    prepared = await run_in_threadpool(prepare_import, records)
+    return await db.run_sync(write_import, prepared)
@@ -0,0 +1,167 @@
+"""
+Export service - Streaming patient extracts (CSV / NDJSON)
+
+Rows are read through a server-side cursor (``stream_results`` with
+``yield_per``) and encoded one batch at a time, so memory use stays constant
+however many patients match. Exports accept the same filters as the
+paginated list (see patients.build_patient_filters).
+"""
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+import csv
+import io
+import zlib
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import and_, select
+from sqlalchemy.sql import Select
+
+from .. import models
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.metrics import time_serialization
+from .patients import SORT_COLUMNS, build_patient_filters, search_relevance
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Exportable columns by output name (the patients table, in model order)
+EXPORT_COLUMNS = {
+    column.key: getattr(models.Patient, column.key)
+    for column in models.Patient.__table__.columns
+}
+
+
+def parse_export_columns(columns: Optional[List[str]]) -> List[str]:
+    """
+    Resolve the requested column names
+
+    Accepts repeated and/or comma-separated names; None or empty exports every
+    column. Raises 400 for unknown names.
+    """
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    names: List[str] = []
+    for value in columns:
+        for name in value.split(","):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+    unknown = [name for name in names if name not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export columns: {', '.join(unknown)}. "
+                   f"Available: {', '.join(EXPORT_COLUMNS)}"
+        )
+    if not names:
+        return list(EXPORT_COLUMNS)
+    return names
+
+
+def build_export_statement(
+    columns: Sequence[str],
+    sort_by: str = "createdAt",
+    sort_order: str = "desc",
+    **filters,
+) -> Select:
+    """
+    Build the SELECT for an export
+
+    Args:
+        columns: Output column names (see parse_export_columns)
+        sort_by: Any list sort key (relevance requires a search)
+        sort_order: asc or desc
+        **filters: build_patient_filters arguments
+    """
+    statement = select(*[EXPORT_COLUMNS[name] for name in columns])
+    criteria = build_patient_filters(**filters)
+    if criteria:
+        statement = statement.where(and_(*criteria))
+
+    # Same ordering as the list (Patient.id breaks ties)
+    search = filters.get("search")
+    if sort_by == "relevance" and search and search.strip():
+        order_expression = search_relevance(search)
+    else:
+        order_expression = SORT_COLUMNS.get(sort_by, SORT_COLUMNS["createdAt"])
+    if sort_order == "desc":
+        return statement.order_by(order_expression.desc(), models.Patient.id.desc())
+    return statement.order_by(order_expression.asc(), models.Patient.id.asc())
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        # JSONB string arrays (allergies, conditions)
+        return ";".join(str(item) for item in value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv_rows(rows: Iterable[Sequence], header: Optional[Sequence[str]] = None) -> bytes:
+    """Encode rows (and optionally a header line) as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson_rows(rows: Iterable[Sequence], columns: Sequence[str]) -> bytes:
+    """Encode rows as newline-delimited JSON objects"""
+    return b"".join(
+        orjson.dumps(dict(zip(columns, row))) + b"\n"
+        for row in rows
+    )
+
+
+async def stream_patient_export(
+    statement: Select,
+    columns: Sequence[str],
+    export_format: str = "csv",
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the encoded export, one chunk per fetched batch
+
+    Uses its own session so the server-side cursor lives exactly as long as
+    the response body is being sent.
+
+    Args:
+        statement: SELECT from build_export_statement
+        columns: Column names matching the statement's columns
+        export_format: csv or ndjson
+        compress: gzip the output
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if export_format == "csv":
+        chunk = emit(encode_csv_rows([], header=columns))
+        if chunk:
+            yield chunk
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            with time_serialization(f"export_{export_format}"):
+                if export_format == "csv":
+                    chunk = emit(encode_csv_rows(rows))
+                else:
+                    chunk = emit(encode_ndjson_rows(rows, columns))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,131 @@
+"""
+Facets service - Filter sidebar counts for the patient list
+
+All facets are counted over the filtered patient set in one statement and
+one scan: a LATERAL subquery turns every matching patient into one
+(facet, value) row per facet it contributes to (its status, blood type and
+insurance provider, each condition and allergy, every last-visit bucket it
+falls in), and a single GROUP BY counts them.
+
+Counts use the same filters as the list (patients.build_patient_filters), so
+each facet reflects the current selection. Serialized results are cached per
+filter signature and validated against the patient list version, so any
+patient write invalidates them on every worker.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, literal, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..core.cache import patient_facets_cache
+from ..core.metrics import time_serialization
+from .patients import (
+    LAST_VISIT_BUCKETS,
+    build_patient_filters,
+    get_patient_list_version_async,
+    last_visit_filter,
+)
+from .totals import filter_signature
+
+# Response field for each facet
+FACET_FIELDS = {
+    "status": "status",
+    "blood_type": "bloodType",
+    "insurance_provider": "insuranceProvider",
+    "conditions": "conditions",
+    "allergies": "allergies",
+    "last_visit": "lastVisit",
+}
+
+
+def build_facets_statement(today: Optional[date] = None, **filters):
+    """
+    Build the single-scan facet count query
+
+    Args:
+        today: Reference date for the last-visit buckets (default: today)
+        **filters: build_patient_filters arguments
+
+    Returns:
+        SELECT yielding (facet, value, count) rows
+    """
+    today = today or date.today()
+    patient = models.Patient
+
+    def facet_rows(facet: str, value, *where):
+        # Correlated to the outer patients row by the LATERAL join
+        return select(literal(facet).label("facet"), value.label("value")).where(*where).correlate(patient)
+
+    facet_values = union_all(
+        facet_rows("status", patient.status),
+        facet_rows("blood_type", patient.blood_type),
+        facet_rows("insurance_provider", patient.insurance_provider),
+        facet_rows("conditions", func.jsonb_array_elements_text(patient.conditions)),
+        facet_rows("allergies", func.jsonb_array_elements_text(patient.allergies)),
+        *[
+            facet_rows("last_visit", literal(bucket), last_visit_filter(bucket, today))
+            for bucket in LAST_VISIT_BUCKETS
+        ],
+    ).subquery("facet_values").lateral()
+
+    statement = (
+        select(facet_values.c.facet, facet_values.c.value, func.count().label("count"))
+        .select_from(patient)
+        .join(facet_values, true())
+        .group_by(facet_values.c.facet, facet_values.c.value)
+    )
+    criteria = build_patient_filters(**filters)
+    if criteria:
+        statement = statement.where(and_(*criteria))
+    return statement
+
+
+def get_patient_facets(db: Session, today: Optional[date] = None, **filters) -> schemas.PatientFacets:
+    """
+    Count every facet over the patients matching the list filters
+
+    Values are ordered by count (descending), then value. ``total`` is the
+    number of matching patients.
+    """
+    counts: Dict[str, List[schemas.FacetCount]] = defaultdict(list)
+    for facet, value, count in db.execute(build_facets_statement(today, **filters)):
+        counts[facet].append(schemas.FacetCount(value=value, count=count))
+
+    for facet, values in counts.items():
+        if facet == "last_visit":
+            # Keep the filter's bucket order
+            values.sort(key=lambda item: LAST_VISIT_BUCKETS.index(item.value))
+        else:
+            values.sort(key=lambda item: (-item.count, item.value or ""))
+
+    return schemas.PatientFacets(
+        # Every patient contributes exactly one status row (NULL included)
+        total=sum(item.count for item in counts["status"]),
+        **{field: counts[facet] for facet, field in FACET_FIELDS.items()},
+    )
+
+
+async def get_patient_facets_json_async(db: AsyncSession, **filters) -> bytes:
+    """
+    Serialized facets, read through the facets cache
+
+    Keyed by the normalized filter signature (plus today's date, which the
+    last-visit buckets depend on) and validated against the patient list
+    version.
+    """
+    today = date.today()
+    signature = filter_signature(facet_day=today, **filters)
+    version = await get_patient_list_version_async(db)
+    payload = await patient_facets_cache.get(signature, version)
+    if payload is not None:
+        return payload
+
+    facets = await db.run_sync(get_patient_facets, today, **filters)
+    with time_serialization("facets"):
+        payload = facets.model_dump_json(by_alias=True).encode("utf-8")
+    await patient_facets_cache.set(signature, version, payload)
+    return payload
@@ -1,16 +1,27 @@
 """
 Patient service - Business logic for patient operations
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func as sql_func, cast
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, func as sql_func, tuple_, exists
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from typing import Optional, List, Any, Dict, Tuple
 from datetime import date, timedelta, datetime
+import base64
+import binascii
+import json
 import math
+import re
 
 from .. import models, schemas
+from ..core.cache import patient_detail_cache
 from ..core.config import settings
+from ..core.etag import make_etag
+from ..core.metrics import time_serialization
+from ..core.singleflight import patient_list_flight
+from .stats import invalidate_stats_cache, patient_stat_keys_for, record_patient_stats
+from .totals import filter_signature, get_total, invalidate_patient_totals
 from fastapi import HTTPException
 
 
@@ -100,64 +111,269 @@ def convert_patient_to_schema(patient: models.Patient) -> schemas.Patient:
     )
 
 
-def get_paginated_patients(
-    db: Session,
-    page: int = 1,
-    page_size: int = None,
+# Sortable list columns. Each one is backed by a composite (column, id) index
+# so both offset and keyset pages can be served from an index scan.
+SORT_COLUMNS = {
+    "firstName": models.Patient.first_name,
+    "lastName": models.Patient.last_name,
+    "dateOfBirth": models.Patient.date_of_birth,
+    "createdAt": models.Patient.created_at,
+    "status": models.Patient.status,
+    "insuranceProvider": models.Patient.insurance_provider,
+}
+
+# Sort keys whose column may hold NULL (Postgres sorts NULLs last in asc order,
+# first in desc order, so keyset predicates need to account for them)
+NULLABLE_SORT_KEYS = {"status"}
+
+
+def _serialize_cursor_value(value: Any) -> Any:
+    """Convert a sort column value into a JSON-safe cursor value"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _deserialize_cursor_value(sort_by: str, value: Any) -> Any:
+    """Convert a cursor value back into the Python type of its sort column"""
+    if value is None:
+        return None
+    if sort_by == "dateOfBirth":
+        return date.fromisoformat(value)
+    if sort_by == "createdAt":
+        return datetime.fromisoformat(value)
+    return str(value)
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, patient_id: str) -> str:
+    """Build an opaque keyset cursor pointing just after the given row"""
+    payload = {
+        "s": sort_by,
+        "o": sort_order,
+        "v": _serialize_cursor_value(value),
+        "id": patient_id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, str]:
+    """
+    Decode a keyset cursor into (sort value, patient id)
+    
+    Raises:
+        HTTPException 400 if the cursor is malformed or was issued for a
+        different sort than the current request
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort_by = payload["s"]
+        cursor_sort_order = payload["o"]
+        value = _deserialize_cursor_value(cursor_sort_by, payload["v"])
+        patient_id = str(payload["id"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if cursor_sort_by != sort_by or cursor_sort_order != sort_order:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor does not match the requested sort_by/sort_order"
+        )
+    
+    return value, patient_id
+
+
+def _keyset_filter(sort_by: str, sort_order: str, value: Any, patient_id: str):
+    """
+    Build the WHERE clause selecting rows strictly after (value, patient_id)
+    in (sort column, id) order
+    """
+    sort_field = SORT_COLUMNS[sort_by]
+    nullable = sort_by in NULLABLE_SORT_KEYS
+    
+    if value is None:
+        # NULL block: first in desc order, last in asc order
+        null_block_after = and_(
+            sort_field.is_(None),
+            models.Patient.id < patient_id if sort_order == "desc" else models.Patient.id > patient_id,
+        )
+        if sort_order == "desc":
+            return or_(null_block_after, sort_field.isnot(None))
+        return null_block_after
+    
+    # Row-value comparison lets Postgres seek directly into the (column, id) index
+    if sort_order == "desc":
+        after = tuple_(sort_field, models.Patient.id) < tuple_(value, patient_id)
+    else:
+        after = tuple_(sort_field, models.Patient.id) > tuple_(value, patient_id)
+        if nullable:
+            after = or_(after, sort_field.is_(None))
+    return after
+
+
+# Columns selected for the patient list (PatientListItem fields)
+PATIENT_LIST_COLUMNS = (
+    models.Patient.id,
+    models.Patient.first_name,
+    models.Patient.last_name,
+    models.Patient.date_of_birth,
+    models.Patient.email,
+    models.Patient.phone,
+    models.Patient.status,
+    models.Patient.last_visit,
+    models.Patient.blood_type,
+    models.Patient.insurance_provider,
+)
+PATIENT_LIST_COLUMN_KEYS = {column.key for column in PATIENT_LIST_COLUMNS}
+
+
+def row_to_list_item(row) -> schemas.PatientListItem:
+    """Build a list item from a projected PATIENT_LIST_COLUMNS row (or a Patient)"""
+    return schemas.PatientListItem(
+        id=row.id,
+        first_name=row.first_name,
+        last_name=row.last_name,
+        date_of_birth=row.date_of_birth.isoformat() if row.date_of_birth else "",
+        email=row.email,
+        phone=row.phone,
+        status=row.status or "active",
+        last_visit=row.last_visit.isoformat() if row.last_visit else None,
+        blood_type=row.blood_type,
+        insurance_provider=row.insurance_provider,
+    )
+
+
+# Search terms made only of these characters are also matched against phone digits
+PHONE_SEARCH_PATTERN = re.compile(r"[\d\s()+.\-]+")
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_filter(search: str):
+    """
+    Build the search predicate over name, email and phone
+    
+    Matches against the indexed search expressions in models (lower-cased full
+    name and email, digit-only phone), so Postgres can use the pg_trgm GIN
+    indexes instead of scanning the table. Phone matching is digit-normalized:
+    "(555) 123" finds "555-123-4567".
+    
+    Returns None for a blank search.
+    """
+    term = search.strip().lower()
+    if not term:
+        return None
+    
+    pattern = f"%{_escape_like(term)}%"
+    clauses = [
+        models.search_name_expression().like(pattern),
+        models.search_email_expression().like(pattern),
+    ]
+    if PHONE_SEARCH_PATTERN.fullmatch(term):
+        digits = re.sub(r"\D", "", term)
+        if digits:
+            clauses.append(models.search_phone_expression().like(f"%{digits}%"))
+    return or_(*clauses)
+
+
+def search_relevance(search: str):
+    """Trigram similarity of the best-matching search expression (0..1)"""
+    term = search.strip().lower()
+    return sql_func.greatest(
+        sql_func.similarity(models.search_name_expression(), term),
+        sql_func.similarity(models.search_email_expression(), term),
+    )
+
+
+def _jsonb_array_filter(column, values, match: str = "any"):
+    """
+    Match a JSONB string array against one or more values
+    
+    Uses the key-existence operators (?| for any, ?& for all), which the
+    default jsonb_ops GIN index on the column can answer directly.
+    """
+    if isinstance(values, str):
+        values = [values]
+    values = array([str(value) for value in values])
+    if match == "all":
+        return column.has_all(values)
+    return column.has_any(values)
+
+
+def _active_medication_filter(medication_names: List[str]):
+    """
+    EXISTS predicate: patient has an active medication whose name contains
+    any of the given terms (case-insensitive)
+    
+    Matches the partial index on medications (patient_id, lower(name))
+    WHERE is_active, so each probe is an index lookup by patient.
+    """
+    name_expression = sql_func.lower(models.Medication.name)
+    name_filters = [
+        name_expression.like(f"%{_escape_like(name.strip().lower())}%")
+        for name in medication_names
+    ]
+    return exists().where(
+        models.Medication.patient_id == models.Patient.id,
+        models.Medication.is_active,
+        or_(*name_filters),
+    )
+
+
+# last_visit filter values: visited within the last N days, or over a year ago
+LAST_VISIT_DAYS = {
+    "last_week": 7,
+    "last_month": 30,
+    "last_3_months": 90,
+    "last_6_months": 180,
+    "last_year": 365,
+}
+LAST_VISIT_BUCKETS = (*LAST_VISIT_DAYS, "over_year")
+
+
+def last_visit_filter(last_visit: str, today: Optional[date] = None):
+    """Predicate for a last_visit filter value (None for unknown values)"""
+    today = today or date.today()
+    if last_visit == "over_year":
+        return models.Patient.last_visit < today - timedelta(days=365)
+    days = LAST_VISIT_DAYS.get(last_visit)
+    if days is None:
+        return None
+    return models.Patient.last_visit >= today - timedelta(days=days)
+
+
+def build_patient_filters(
     search: Optional[str] = None,
     status: Optional[str] = None,
     blood_type: Optional[str] = None,
     city: Optional[str] = None,
     state: Optional[str] = None,
     insurance_provider: Optional[List[str]] = None,
-    allergies: Optional[str] = None,
+    allergies: Optional[List[str]] = None,
     current_medications: Optional[List[str]] = None,
     conditions: Optional[List[str]] = None,
     last_visit: Optional[str] = None,
-    sort_by: str = "createdAt",
-    sort_order: str = "desc",
-) -> schemas.PaginatedPatients:
+    allergies_match: str = "any",
+    conditions_match: str = "any",
+) -> List:
     """
-    Get paginated patients from database with search, filter, and sort
+    Build the WHERE criteria for the patient list filters
     
-    Args:
-        db: Database session
-        page: Page number (1-indexed)
-        page_size: Number of items per page
-        search: Search term (searches name, email, phone)
-        status: Filter by status (active, inactive, critical)
-        blood_type: Filter by blood type
-        city: Filter by city
-        state: Filter by state
-        insurance_provider: Filter by insurance provider
-        sort_by: Field to sort by (firstName, lastName, dateOfBirth, createdAt, status)
-        sort_order: Sort direction (asc, desc)
-        
-    Returns:
-        PaginatedPatients schema with patients and pagination metadata
+    Shared by the paginated list, export and facet queries so they always
+    select the same patients for the same parameters. Returns an empty list
+    when nothing is filtered.
     """
-    if page_size is None:
-        page_size = settings.DEFAULT_PAGE_SIZE
-    
-    # Start with base query
-    query = db.query(models.Patient)
+    filters = []
     
-    # Apply search filter
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                models.Patient.first_name.ilike(search_term),
-                models.Patient.last_name.ilike(search_term),
-                models.Patient.email.ilike(search_term),
-                models.Patient.phone.ilike(search_term),
-                # Search in full name (concatenated)
-                (models.Patient.first_name + " " + models.Patient.last_name).ilike(search_term)
-            )
-        )
+    # Search (served by the trigram indexes on the search expressions)
+    search_filter = build_search_filter(search) if search else None
+    if search_filter is not None:
+        filters.append(search_filter)
     
-    # Apply filters
-    filters = []
     if status:
         filters.append(models.Patient.status == status)
     if blood_type:
@@ -179,111 +395,174 @@ def get_paginated_patients(
             ]
             filters.append(or_(*insurance_filters))
     
-    # Filter by allergies (JSONB array contains)
-    # PostgreSQL: use JSONB containment operator @>
+    # Filter by allergies / conditions (JSONB string arrays)
+    # A single ?| (any) or ?& (all) predicate per column is served by its GIN index
     if allergies:
-        # Check if allergy string exists in the JSONB array
-        filters.append(
-            models.Patient.allergies.op("@>")(cast(f'["{allergies}"]', JSONB))
-        )
-    
-    # Filter by conditions (JSONB array contains - can be multiple)
+        filters.append(_jsonb_array_filter(models.Patient.allergies, allergies, allergies_match))
     if conditions:
-        if len(conditions) == 1:
-            filters.append(
-                models.Patient.conditions.op("@>")(cast(f'["{conditions[0]}"]', JSONB))
-            )
-        else:
-            # Multiple conditions - use OR condition
-            condition_filters = [
-                models.Patient.conditions.op("@>")(cast(f'["{condition}"]', JSONB))
-                for condition in conditions
-            ]
-            filters.append(or_(*condition_filters))
+        filters.append(_jsonb_array_filter(models.Patient.conditions, conditions, conditions_match))
     
     # Filter by current medications (check active medications - can be multiple)
-    # Use distinct to avoid duplicates when joining with medications
+    # Correlated EXISTS semi-join: no row multiplication, so no DISTINCT needed
     if current_medications:
-        if len(current_medications) == 1:
-            query = query.join(models.Medication).filter(
-                and_(
-                    models.Medication.name.ilike(f"%{current_medications[0]}%"),
-                    models.Medication.is_active == True
-                )
-            ).distinct()
-        else:
-            # Multiple medications - use OR condition
-            medication_filters = [
-                and_(
-                    models.Medication.name.ilike(f"%{med}%"),
-                    models.Medication.is_active == True
-                )
-                for med in current_medications
-            ]
-            query = query.join(models.Medication).filter(or_(*medication_filters)).distinct()
+        filters.append(_active_medication_filter(current_medications))
     
     # Filter by last visit date range
     if last_visit:
-        today = date.today()
-        if last_visit == 'last_week':
-            filters.append(models.Patient.last_visit >= today - timedelta(days=7))
-        elif last_visit == 'last_month':
-            filters.append(models.Patient.last_visit >= today - timedelta(days=30))
-        elif last_visit == 'last_3_months':
-            filters.append(models.Patient.last_visit >= today - timedelta(days=90))
-        elif last_visit == 'last_6_months':
-            filters.append(models.Patient.last_visit >= today - timedelta(days=180))
-        elif last_visit == 'last_year':
-            filters.append(models.Patient.last_visit >= today - timedelta(days=365))
-        elif last_visit == 'over_year':
-            filters.append(models.Patient.last_visit < today - timedelta(days=365))
-    
-    # Apply all filters at once
-    if filters:
-        query = query.filter(and_(*filters))
+        last_visit_clause = last_visit_filter(last_visit)
+        if last_visit_clause is not None:
+            filters.append(last_visit_clause)
+    
+    return filters
+
+
+def get_paginated_patients(
+    db: Session,
+    page: int = 1,
+    page_size: int = None,
+    search: Optional[str] = None,
+    status: Optional[str] = None,
+    blood_type: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    insurance_provider: Optional[List[str]] = None,
+    allergies: Optional[List[str]] = None,
+    current_medications: Optional[List[str]] = None,
+    conditions: Optional[List[str]] = None,
+    last_visit: Optional[str] = None,
+    allergies_match: str = "any",
+    conditions_match: str = "any",
+    sort_by: str = "createdAt",
+    sort_order: str = "desc",
+    cursor: Optional[str] = None,
+    count_mode: str = "auto",
+    list_version: Optional[str] = None,
+) -> schemas.PaginatedPatients:
+    """
+    Get paginated patients from database with search, filter, and sort
+    
+    Two pagination modes are supported:
+    - Page mode (default): ``page`` is translated into an OFFSET.
+    - Keyset mode: when ``cursor`` is given, ``page`` is ignored and rows are
+      fetched strictly after the cursor position, so every page costs the
+      same regardless of depth. Every response carries ``nextCursor`` for
+      the following page (None on the last page).
+    
+    Args:
+        db: Database session
+        page: Page number (1-indexed)
+        page_size: Number of items per page
+        search: Search term (searches name, email, phone)
+        status: Filter by status (active, inactive, critical)
+        blood_type: Filter by blood type
+        city: Filter by city
+        state: Filter by state
+        insurance_provider: Filter by insurance provider
+        allergies: Filter by allergies (can be multiple)
+        conditions: Filter by conditions (can be multiple)
+        allergies_match: "any" (has at least one) or "all" (has every) allergy
+        conditions_match: "any" (has at least one) or "all" (has every) condition
+        sort_by: Field to sort by (firstName, lastName, dateOfBirth, createdAt, status,
+            insuranceProvider, or relevance when searching)
+        sort_order: Sort direction (asc, desc)
+        cursor: Opaque keyset cursor from a previous response's nextCursor
+        count_mode: How ``total`` is computed - auto, exact or estimate
+            (see services.totals). Estimated totals set ``totalIsEstimate``.
+        list_version: Patient list version, if the caller already has it
+            (cached exact totals are validated against it)
+        
+    Returns:
+        PaginatedPatients schema with patients and pagination metadata
+    """
+    if page_size is None:
+        page_size = settings.DEFAULT_PAGE_SIZE
+    
+    # Start with base query
+    query = db.query(models.Patient)
     
+    # Apply search and filters
+    filters = build_patient_filters(
+        search=search,
+        status=status,
+        blood_type=blood_type,
+        city=city,
+        state=state,
+        insurance_provider=insurance_provider,
+        allergies=allergies,
+        current_medications=current_medications,
+        conditions=conditions,
+        last_visit=last_visit,
+        allergies_match=allergies_match,
+        conditions_match=conditions_match,
+    )
     if filters:
         query = query.filter(and_(*filters))
     
-    # Get total count (before pagination)
-    total = query.count()
-    
-    # Apply sorting
-    sort_mapping = {
-        "firstName": models.Patient.first_name,
-        "lastName": models.Patient.last_name,
-        "dateOfBirth": models.Patient.date_of_birth,
-        "createdAt": models.Patient.created_at,
-        "status": models.Patient.status,
-        "insuranceProvider": models.Patient.insurance_provider,
-    }
+    # Resolve the sort and validate the cursor first, so a bad request is
+    # rejected before the total is computed
+    if sort_by == "relevance" and search and search.strip():
+        if cursor:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor pagination is not supported with sort_by=relevance"
+            )
+        order_expression = search_relevance(search)
+        sort_field = None
+    else:
+        if sort_by not in SORT_COLUMNS:
+            sort_by = "createdAt"
+        order_expression = sort_field = SORT_COLUMNS[sort_by]
+    if cursor:
+        cursor_value, cursor_id = decode_cursor(cursor, sort_by, sort_order)
+    
+    # Get total count (before pagination) - cached or estimated where possible
+    signature = filter_signature(
+        search=search,
+        status=status,
+        blood_type=blood_type,
+        city=city,
+        state=state,
+        insurance_provider=insurance_provider,
+        allergies=allergies,
+        current_medications=current_medications,
+        conditions=conditions,
+        last_visit=last_visit,
+        allergies_match=allergies_match if allergies else None,
+        conditions_match=conditions_match if conditions else None,
+        last_visit_day=date.today() if last_visit else None,
+    )
+    is_filtered = bool(filters)
+    if list_version is None:
+        list_version = get_patient_list_version(db)
+    total, total_is_estimate = get_total(db, query, signature, list_version, is_filtered, count_mode)
     
-    sort_field = sort_mapping.get(sort_by, models.Patient.created_at)
+    # Apply sorting (Patient.id breaks ties so the order is total and stable)
     if sort_order == "desc":
-        query = query.order_by(sort_field.desc())
+        query = query.order_by(order_expression.desc(), models.Patient.id.desc())
     else:
-        query = query.order_by(sort_field.asc())
+        query = query.order_by(order_expression.asc(), models.Patient.id.asc())
     
-    # Apply pagination
-    offset = (page - 1) * page_size
-    patients_query = query.offset(offset).limit(page_size).all()
+    # Apply pagination (fetch one extra row to know whether a next page exists)
+    if cursor:
+        query = query.filter(_keyset_filter(sort_by, sort_order, cursor_value, cursor_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+    # Project only the list columns (plus the sort column for the cursor):
+    # rows come back as plain tuples, skipping ORM entity hydration
+    columns = list(PATIENT_LIST_COLUMNS)
+    if sort_field is not None and sort_field.key not in PATIENT_LIST_COLUMN_KEYS:
+        columns.append(sort_field)
+    rows = query.with_entities(*columns).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    page_rows = rows[:page_size]
+    
+    next_cursor = None
+    if has_more and page_rows and sort_field is not None:
+        last = page_rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_field.key), last.id)
     
     # Convert to simplified list item schemas (only fields needed for table)
-    patients = [
-        schemas.PatientListItem(
-            id=patient.id,
-            first_name=patient.first_name,
-            last_name=patient.last_name,
-            date_of_birth=patient.date_of_birth.isoformat() if patient.date_of_birth else "",
-            email=patient.email,
-            phone=patient.phone,
-            status=patient.status or "active",
-            last_visit=patient.last_visit.isoformat() if patient.last_visit else None,
-            blood_type=patient.blood_type,
-            insurance_provider=patient.insurance_provider,
-        )
-        for patient in patients_query
-    ]
+    patients = [row_to_list_item(row) for row in page_rows]
     
     # Calculate total pages
     total_pages = math.ceil(total / page_size) if total > 0 else 0
@@ -293,13 +572,36 @@ def get_paginated_patients(
         total=total,
         page=page,
         pageSize=page_size,
-        totalPages=total_pages
+        totalPages=total_pages,
+        totalIsEstimate=total_is_estimate,
+        nextCursor=next_cursor
+    )
+
+
+def load_patient_detail(db: Session, patient_id: str) -> Optional[models.Patient]:
+    """
+    Load a patient together with everything convert_patient_to_schema reads
+    
+    Medications are joined into the patient query and documents are fetched
+    with one IN query, so a chart costs two statements instead of one plus a
+    lazy load per relationship. populate_existing() makes it safe to call
+    after a commit to reload an already-present (expired) instance.
+    """
+    return (
+        db.query(models.Patient)
+        .options(
+            joinedload(models.Patient.medications),
+            selectinload(models.Patient.documents),
+        )
+        .populate_existing()
+        .filter(models.Patient.id == patient_id)
+        .one_or_none()
     )
 
 
 def get_patient_by_id(db: Session, patient_id: str) -> schemas.Patient:
     """Get a single patient by ID"""
-    patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    patient = load_patient_detail(db, patient_id)
     
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
@@ -307,6 +609,51 @@ def get_patient_by_id(db: Session, patient_id: str) -> schemas.Patient:
     return convert_patient_to_schema(patient)
 
 
+def get_patient_version(db: Session, patient_id: str) -> str:
+    """
+    Current version (updated_at) of a patient - one primary-key lookup
+    
+    Used to validate cached detail responses without loading the chart.
+    """
+    row = db.query(models.Patient.updated_at).filter(models.Patient.id == patient_id).one_or_none()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    return row.updated_at.isoformat() if row.updated_at else ""
+
+
+def patient_etag(patient_id: str, version: str) -> str:
+    """Strong ETag for a patient detail response"""
+    return make_etag("patient", patient_id, version)
+
+
+def get_patient_list_version(db: Session) -> str:
+    """
+    Latest updated_at across all patients (served by the updated_at index)
+    
+    Every create and update moves it forward, so it versions any list view:
+    a patient that leaves or joins a filtered set changes it too, which a max
+    over only the filtered rows would miss.
+    """
+    latest = db.query(sql_func.max(models.Patient.updated_at)).scalar()
+    return latest.isoformat() if latest else ""
+
+
+def patient_list_etag(version: str, cursor: Optional[str] = None, **params) -> str:
+    """Strong ETag for a list response: query parameters + list version"""
+    if params.get("last_visit"):
+        # Relative date buckets move at midnight
+        params["today"] = date.today()
+    return make_etag("patients", filter_signature(**params), cursor or "", version)
+
+
+def serialize_patient(patient: schemas.Patient) -> bytes:
+    """Serialize a patient exactly as the API returns it (by alias)"""
+    with time_serialization("patient_detail"):
+        return patient.model_dump_json(by_alias=True).encode("utf-8")
+
+
 def update_patient_personal_info(
     db: Session,
     patient_id: str,
@@ -395,7 +742,8 @@ def update_patient_personal_info(
     # Commit changes with error handling for race conditions
     try:
         db.commit()
-        db.refresh(patient)
+        invalidate_patient_totals()
+        patient = load_patient_detail(db, patient_id)
     except IntegrityError as e:
         db.rollback()
         # Handle unique constraint violation (race condition scenario)
@@ -442,7 +790,8 @@ def update_patient_emergency_contact(
     
     # Commit changes
     db.commit()
-    db.refresh(patient)
+    invalidate_patient_totals()
+    patient = load_patient_detail(db, patient_id)
     
     return convert_patient_to_schema(patient)
 
@@ -453,11 +802,21 @@ def update_patient_insurance_info(
     update_data: schemas.InsuranceInfoUpdate
 ) -> schemas.Patient:
     """Update patient insurance information (partial update)"""
-    patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    # Row lock: concurrent updates of this patient read their "before"
+    # stats buckets one at a time, so the deltas stay exact
+    patient = (
+        db.query(models.Patient)
+        .filter(models.Patient.id == patient_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
     
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
+    stat_keys = patient_stat_keys_for(patient)
+    
     # Update fields if provided
     update_dict = update_data.model_dump(exclude_unset=True, by_alias=True)
     
@@ -483,9 +842,14 @@ def update_patient_insurance_info(
     # Update updated_at timestamp
     patient.updated_at = datetime.utcnow()
     
+    # Move the patient between dashboard stats buckets
+    record_patient_stats(db, stat_keys, patient_stat_keys_for(patient))
+    
     # Commit changes
     db.commit()
-    db.refresh(patient)
+    invalidate_patient_totals()
+    invalidate_stats_cache()
+    patient = load_patient_detail(db, patient_id)
     
     return convert_patient_to_schema(patient)
 
@@ -496,11 +860,21 @@ def update_patient_medical_info(
     update_data: schemas.MedicalInfoUpdate
 ) -> schemas.Patient:
     """Update patient medical information (partial update)"""
-    patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    # Row lock: concurrent updates of this patient read their "before"
+    # stats buckets one at a time, so the deltas stay exact
+    patient = (
+        db.query(models.Patient)
+        .filter(models.Patient.id == patient_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
     
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
+    stat_keys = patient_stat_keys_for(patient)
+    
     # Update fields if provided
     update_dict = update_data.model_dump(exclude_unset=True, by_alias=True)
     
@@ -517,9 +891,14 @@ def update_patient_medical_info(
     # Update updated_at timestamp
     patient.updated_at = datetime.utcnow()
     
+    # Move the patient between dashboard stats buckets
+    record_patient_stats(db, stat_keys, patient_stat_keys_for(patient))
+    
     # Commit changes
     db.commit()
-    db.refresh(patient)
+    invalidate_patient_totals()
+    invalidate_stats_cache()
+    patient = load_patient_detail(db, patient_id)
     
     return convert_patient_to_schema(patient)
 
@@ -559,12 +938,78 @@ def update_patient_medications(
     
     # Commit changes
     db.commit()
-    db.refresh(patient)
+    invalidate_patient_totals()
+    patient = load_patient_detail(db, patient_id)
     
     return convert_patient_to_schema(patient)
 
 
 
+def patient_create_values(
+    patient_data: schemas.PatientCreate
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Map a PatientCreate onto column values
+    
+    Returns (patient column values, medication column values without
+    patient_id). Shared by create_patient and the bulk import.
+    
+    Raises:
+        ValueError: A date is not in YYYY-MM-DD format
+    """
+    # Convert patient data to dict using by_alias=False to get camelCase field names
+    # (by_alias=True would give us snake_case alias names)
+    patient_dict = patient_data.model_dump(exclude_unset=True, by_alias=False)
+    
+    patient_values = dict(
+        first_name=patient_dict["firstName"],
+        last_name=patient_dict["lastName"],
+        date_of_birth=datetime.strptime(patient_dict["dateOfBirth"], "%Y-%m-%d").date(),
+        email=patient_dict["email"],
+        phone=patient_dict["phone"],
+        blood_type=patient_dict.get("bloodType"),
+        # Address
+        address_street=patient_dict["address"]["street"],
+        address_city=patient_dict["address"]["city"],
+        address_state=patient_dict["address"]["state"],
+        address_zip_code=patient_dict["address"].get("zipCode", ""),
+        address_country=patient_dict["address"].get("country", "USA"),
+        # Emergency Contact
+        emergency_contact_name=patient_dict["emergencyContact"]["name"],
+        emergency_contact_relationship=patient_dict["emergencyContact"]["relationship"],
+        emergency_contact_phone=patient_dict["emergencyContact"]["phone"],
+        emergency_contact_email=patient_dict["emergencyContact"].get("email"),
+        # Medical Info
+        allergies=patient_dict.get("allergies", []),
+        conditions=patient_dict.get("conditions", []),
+        last_visit=datetime.strptime(patient_dict["lastVisit"], "%Y-%m-%d").date() if patient_dict.get("lastVisit") and patient_dict["lastVisit"] else None,
+        status=patient_dict.get("status", "active"),
+        # Insurance Info
+        insurance_provider=patient_dict["insurance"]["provider"],
+        insurance_policy_number=patient_dict["insurance"].get("policyNumber", ""),
+        insurance_group_number=patient_dict["insurance"].get("groupNumber"),
+        insurance_effective_date=datetime.strptime(patient_dict["insurance"].get("effectiveDate", ""), "%Y-%m-%d").date(),
+        insurance_expiration_date=datetime.strptime(patient_dict["insurance"]["expirationDate"], "%Y-%m-%d").date() if patient_dict["insurance"].get("expirationDate") else None,
+        insurance_copay=patient_dict["insurance"]["copay"],
+        insurance_deductible=patient_dict["insurance"]["deductible"],
+    )
+    
+    medication_values = [
+        dict(
+            name=med_data["name"],
+            dosage=med_data["dosage"],
+            frequency=med_data["frequency"],
+            prescribed_by=med_data.get("prescribedBy", ""),
+            start_date=datetime.strptime(med_data.get("startDate", ""), "%Y-%m-%d").date(),
+            end_date=datetime.strptime(med_data["endDate"], "%Y-%m-%d").date() if med_data.get("endDate") else None,
+            is_active=True,
+        )
+        for med_data in patient_dict.get("medications") or []
+    ]
+    
+    return patient_values, medication_values
+
+
 def create_patient(
     db: Session,
     patient_data: schemas.PatientCreate
@@ -582,69 +1027,28 @@ def create_patient(
             detail=f"Patient with email '{patient_data.email}' already exists"
         )
     
-    # Convert patient data to dict using by_alias=False to get camelCase field names
-    # (by_alias=True would give us snake_case alias names)
-    patient_dict = patient_data.model_dump(exclude_unset=True, by_alias=False)
-    
-    # Parse date of birth
-    dob = datetime.strptime(patient_dict["dateOfBirth"], "%Y-%m-%d").date()
+    # Map the request onto column values (dates parsed here)
+    patient_values, medication_values = patient_create_values(patient_data)
     
     try:
         # Create patient record
-        new_patient = models.Patient(
-            first_name=patient_dict["firstName"],
-            last_name=patient_dict["lastName"],
-            date_of_birth=dob,
-            email=patient_dict["email"],
-            phone=patient_dict["phone"],
-            blood_type=patient_dict.get("bloodType"),
-            # Address
-            address_street=patient_dict["address"]["street"],
-            address_city=patient_dict["address"]["city"],
-            address_state=patient_dict["address"]["state"],
-            address_zip_code=patient_dict["address"].get("zipCode", ""),
-            address_country=patient_dict["address"].get("country", "USA"),
-            # Emergency Contact
-            emergency_contact_name=patient_dict["emergencyContact"]["name"],
-            emergency_contact_relationship=patient_dict["emergencyContact"]["relationship"],
-            emergency_contact_phone=patient_dict["emergencyContact"]["phone"],
-            emergency_contact_email=patient_dict["emergencyContact"].get("email"),
-            # Medical Info
-            allergies=patient_dict.get("allergies", []),
-            conditions=patient_dict.get("conditions", []),
-            last_visit=datetime.strptime(patient_dict["lastVisit"], "%Y-%m-%d").date() if patient_dict.get("lastVisit") and patient_dict["lastVisit"] else None,
-            status=patient_dict.get("status", "active"),
-            # Insurance Info
-            insurance_provider=patient_dict["insurance"]["provider"],
-            insurance_policy_number=patient_dict["insurance"].get("policyNumber", ""),
-            insurance_group_number=patient_dict["insurance"].get("groupNumber"),
-            insurance_effective_date=datetime.strptime(patient_dict["insurance"].get("effectiveDate", ""), "%Y-%m-%d").date(),
-            insurance_expiration_date=datetime.strptime(patient_dict["insurance"]["expirationDate"], "%Y-%m-%d").date() if patient_dict["insurance"].get("expirationDate") else None,
-            insurance_copay=patient_dict["insurance"]["copay"],
-            insurance_deductible=patient_dict["insurance"]["deductible"],
-        )
+        new_patient = models.Patient(**patient_values)
         
         db.add(new_patient)
         db.flush()  # Get patient ID
         
         # Add medications if provided
-        if patient_dict.get("medications"):
-            for med_data in patient_dict["medications"]:
-                medication = models.Medication(
-                    patient_id=new_patient.id,
-                    name=med_data["name"],
-                    dosage=med_data["dosage"],
-                    frequency=med_data["frequency"],
-                    prescribed_by=med_data.get("prescribedBy", ""),
-                    start_date=datetime.strptime(med_data.get("startDate", ""), "%Y-%m-%d").date(),
-                    end_date=datetime.strptime(med_data["endDate"], "%Y-%m-%d").date() if med_data.get("endDate") else None,
-                    is_active=True,
-                )
-                db.add(medication)
+        for med_values in medication_values:
+            db.add(models.Medication(patient_id=new_patient.id, **med_values))
+        
+        # Count the patient in the dashboard stats (same transaction)
+        record_patient_stats(db, after=patient_stat_keys_for(new_patient))
         
         # Commit all changes
         db.commit()
-        db.refresh(new_patient)
+        invalidate_patient_totals()
+        invalidate_stats_cache()
+        new_patient = load_patient_detail(db, new_patient.id)
         
         return convert_patient_to_schema(new_patient)
     
@@ -661,3 +1065,128 @@ def create_patient(
             status_code=400,
             detail="Failed to create patient due to database constraint violation"
         )
+
+
+# Async entry points
+# The service functions above are written against a sync Session. These
+# wrappers run them on an AsyncSession via run_sync: the sync code executes in
+# a greenlet and every database round trip is awaited on the event loop
+# (asyncpg), so concurrent requests no longer serialize behind blocking I/O.
+# Every write path also drops the patient's cached detail response.
+
+async def get_paginated_patients_async(db: AsyncSession, **kwargs) -> schemas.PaginatedPatients:
+    """Async version of get_paginated_patients (same keyword arguments)"""
+    return await db.run_sync(get_paginated_patients, **kwargs)
+
+
+async def get_paginated_patients_coalesced_async(db: AsyncSession, key: str, **kwargs) -> schemas.PaginatedPatients:
+    """
+    get_paginated_patients_async, shared between identical concurrent requests
+    
+    ``key`` must identify the normalized parameters and the list version (the
+    list ETag does): requests with the same key join the in-flight query or
+    reuse its result for LIST_COALESCE_TTL_SECONDS instead of running their
+    own count + page queries. The shared result must not be mutated.
+    """
+    return await patient_list_flight.do(key, lambda: get_paginated_patients_async(db, **kwargs))
+
+
+async def get_patient_by_id_async(db: AsyncSession, patient_id: str) -> schemas.Patient:
+    """Async version of get_patient_by_id"""
+    return await db.run_sync(get_patient_by_id, patient_id)
+
+
+async def get_patient_version_async(db: AsyncSession, patient_id: str) -> str:
+    """Async version of get_patient_version"""
+    return await db.run_sync(get_patient_version, patient_id)
+
+
+async def get_patient_list_version_async(db: AsyncSession) -> str:
+    """Async version of get_patient_list_version"""
+    return await db.run_sync(get_patient_list_version)
+
+
+async def get_patient_detail_json_async(
+    db: AsyncSession,
+    patient_id: str,
+    version: Optional[str] = None
+) -> bytes:
+    """
+    Serialized patient detail, read through the patient detail cache
+    
+    The cache entry is validated against the patient's current updated_at, so
+    a hit costs one primary-key lookup instead of loading three tables and
+    re-serializing the chart. Pass ``version`` if it was already looked up.
+    """
+    if version is None:
+        version = await get_patient_version_async(db, patient_id)
+    payload = await patient_detail_cache.get(patient_id, version)
+    if payload is not None:
+        return payload
+    
+    patient = await db.run_sync(get_patient_by_id, patient_id)
+    payload = serialize_patient(patient)
+    await patient_detail_cache.set(patient_id, patient.updatedAt, payload)
+    return payload
+
+
+async def create_patient_async(db: AsyncSession, patient_data: schemas.PatientCreate) -> schemas.Patient:
+    """Async version of create_patient"""
+    patient = await db.run_sync(create_patient, patient_data)
+    await patient_detail_cache.delete(patient.id)
+    return patient
+
+
+async def update_patient_personal_info_async(
+    db: AsyncSession,
+    patient_id: str,
+    update_data: schemas.PersonalInfoUpdate
+) -> schemas.Patient:
+    """Async version of update_patient_personal_info"""
+    patient = await db.run_sync(update_patient_personal_info, patient_id, update_data)
+    await patient_detail_cache.delete(patient_id)
+    return patient
+
+
+async def update_patient_emergency_contact_async(
+    db: AsyncSession,
+    patient_id: str,
+    update_data: schemas.EmergencyContactUpdate
+) -> schemas.Patient:
+    """Async version of update_patient_emergency_contact"""
+    patient = await db.run_sync(update_patient_emergency_contact, patient_id, update_data)
+    await patient_detail_cache.delete(patient_id)
+    return patient
+
+
+async def update_patient_insurance_info_async(
+    db: AsyncSession,
+    patient_id: str,
+    update_data: schemas.InsuranceInfoUpdate
+) -> schemas.Patient:
+    """Async version of update_patient_insurance_info"""
+    patient = await db.run_sync(update_patient_insurance_info, patient_id, update_data)
+    await patient_detail_cache.delete(patient_id)
+    return patient
+
+
+async def update_patient_medical_info_async(
+    db: AsyncSession,
+    patient_id: str,
+    update_data: schemas.MedicalInfoUpdate
+) -> schemas.Patient:
+    """Async version of update_patient_medical_info"""
+    patient = await db.run_sync(update_patient_medical_info, patient_id, update_data)
+    await patient_detail_cache.delete(patient_id)
+    return patient
+
+
+async def update_patient_medications_async(
+    db: AsyncSession,
+    patient_id: str,
+    update_data: schemas.MedicationsUpdate
+) -> schemas.Patient:
+    """Async version of update_patient_medications"""
+    patient = await db.run_sync(update_patient_medications, patient_id, update_data)
+    await patient_detail_cache.delete(patient_id)
+    return patient
@@ -0,0 +1,269 @@
+"""
+Stats service - Dashboard population totals
+
+Totals are served from the patient_stats summary table instead of
+aggregating patients on every load:
+
+- incremental: every write path applies its +1/-1 deltas to the affected
+  (dimension, value) rows with an upsert in the same transaction as the
+  write (record_patient_stats)
+- reconciliation: reconcile_patient_stats rebuilds the table from patients
+  (on startup and every STATS_RECONCILE_SECONDS), which also picks up rows
+  loaded outside the API (COPY seeding, manual SQL). The last rebuild time
+  is kept in the database, so one worker rebuilds per interval and the
+  others skip.
+
+Visit counts are relative to today, so last visits are stored per date and
+summed over the window at read time. The computed response is kept in a
+per-process micro-cache for STATS_CACHE_TTL_SECONDS, so repeated reads are
+answered from memory.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import case, func, literal, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..core.config import settings
+from ..core.metrics import time_serialization
+
+logger = logging.getLogger(__name__)
+
+StatKey = Tuple[str, str]
+
+# pg_try_advisory_xact_lock key: one reconciliation at a time across workers
+RECONCILE_LOCK_KEY = 7_301_017
+
+
+def patient_stat_keys(status: Optional[str], insurance_provider: Optional[str], last_visit: Optional[date]) -> List[StatKey]:
+    """Summary rows a patient with these values is counted in"""
+    return [
+        ("total", ""),
+        ("status", status or ""),
+        ("insurance_provider", insurance_provider or ""),
+        ("last_visit", last_visit.isoformat() if last_visit else ""),
+    ]
+
+
+def patient_stat_keys_for(patient: models.Patient) -> List[StatKey]:
+    return patient_stat_keys(patient.status, patient.insurance_provider, patient.last_visit)
+
+
+def stat_deltas(before: Iterable[StatKey] = (), after: Iterable[StatKey] = ()) -> Counter:
+    """Net change per summary row when a patient moves from before to after"""
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def apply_stat_deltas(db: Session, deltas: Counter) -> None:
+    """
+    Add deltas to the summary rows (upsert, no commit)
+
+    Runs inside the caller's transaction, so the counts commit or roll back
+    together with the patient write. Callers invalidate the stats cache
+    after committing (invalidate_stats_cache), so a read in between cannot
+    cache the pre-commit counts.
+    """
+    if not deltas:
+        return
+    statement = pg_insert(models.PatientStat).values([
+        {"dimension": dimension, "value": value, "count": delta}
+        for (dimension, value), delta in sorted(deltas.items())
+    ])
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[models.PatientStat.dimension, models.PatientStat.value],
+        set_={"count": models.PatientStat.count + statement.excluded.count},
+    ))
+
+
+def record_patient_stats(db: Session, before: Iterable[StatKey] = (), after: Iterable[StatKey] = ()) -> None:
+    """Apply the deltas for one created (before empty) or updated patient (no commit)"""
+    apply_stat_deltas(db, stat_deltas(before, after))
+
+
+def reconcile_patient_stats(db: Session, max_age_seconds: Optional[float] = None) -> bool:
+    """
+    Rebuild patient_stats from patients
+
+    Takes an EXCLUSIVE lock on patient_stats for the rebuild, so write-path
+    deltas wait for it and then apply on top of the fresh counts. With
+    max_age_seconds, skips the rebuild when the last one (by any worker)
+    is more recent than that. Returns False without doing anything when
+    another worker is already reconciling or the stats are fresh enough.
+    """
+    if not db.execute(select(func.pg_try_advisory_xact_lock(RECONCILE_LOCK_KEY))).scalar():
+        db.rollback()
+        return False
+
+    reconciliation = models.PatientStatsReconciliation
+    if max_age_seconds is not None:
+        age = db.execute(
+            select(func.extract("epoch", func.now() - reconciliation.reconciled_at)).where(reconciliation.id == 1)
+        ).scalar()
+        if age is not None and age < max_age_seconds:
+            db.rollback()
+            return False
+
+    # One scan: GROUPING SETS yields a row per value of each dimension, with
+    # the other dimensions NULL. Constants are inlined so the SELECT and
+    # GROUP BY expressions are identical.
+    patient = models.Patient
+    empty = literal_column("''")
+    status = func.coalesce(patient.status, empty)
+    provider = func.coalesce(patient.insurance_provider, empty)
+    visit = func.coalesce(func.to_char(patient.last_visit, literal_column("'YYYY-MM-DD'")), empty)
+    counts = select(
+        case(
+            (func.grouping(status) == 0, literal_column("'status'")),
+            (func.grouping(provider) == 0, literal_column("'insurance_provider'")),
+            else_=literal_column("'last_visit'"),
+        ),
+        func.coalesce(status, provider, visit),
+        func.count(),
+    ).group_by(func.grouping_sets(status, provider, visit))
+    stat = models.PatientStat
+    total = select(literal("total"), literal(""), func.coalesce(func.sum(stat.count), 0)).where(
+        stat.dimension == "status"
+    )
+    
+    db.execute(text("LOCK TABLE patient_stats IN EXCLUSIVE MODE"))
+    db.execute(stat.__table__.delete())
+    db.execute(stat.__table__.insert().from_select(["dimension", "value", "count"], counts))
+    db.execute(stat.__table__.insert().from_select(["dimension", "value", "count"], total))
+    reconciled = pg_insert(reconciliation).values(id=1, reconciled_at=func.now())
+    db.execute(reconciled.on_conflict_do_update(
+        index_elements=[reconciliation.id],
+        set_={"reconciled_at": reconciled.excluded.reconciled_at},
+    ))
+    db.commit()
+    invalidate_stats_cache()
+    return True
+
+
+def get_patient_stats(db: Session, today: Optional[date] = None) -> schemas.PatientStats:
+    """Read the dashboard totals from patient_stats"""
+    today = today or date.today()
+    stat = models.PatientStat
+    window_start = (today - timedelta(days=30)).isoformat()
+    rows = db.execute(
+        select(stat.dimension, stat.value, stat.count).where(
+            stat.count != 0,
+            or_(stat.dimension != "last_visit", stat.value >= window_start),
+        )
+    ).all()
+
+    by_dimension: Dict[str, Dict[str, int]] = {}
+    for dimension, value, count in rows:
+        by_dimension.setdefault(dimension, {})[value] = count
+
+    # Same windows as the last_week / last_month list filters
+    week_start = (today - timedelta(days=7)).isoformat()
+    visits = by_dimension.get("last_visit", {})
+    by_status = {value: count for value, count in by_dimension.get("status", {}).items() if value}
+    return schemas.PatientStats(
+        total=by_dimension.get("total", {}).get("", 0),
+        byStatus=by_status,
+        byInsuranceProvider={
+            value: count for value, count in by_dimension.get("insurance_provider", {}).items() if value
+        },
+        critical=by_status.get("critical", 0),
+        visitsLast7Days=sum(count for value, count in visits.items() if value and value >= week_start),
+        visitsLast30Days=sum(count for value, count in visits.items() if value),
+    )
+
+
+class StatsCache:
+    """Single-entry, per-process cache of the serialized stats"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._payload: Optional[bytes] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self) -> Optional[bytes]:
+        with self._lock:
+            if self._payload is not None and self._expires_at >= time.monotonic():
+                return self._payload
+            return None
+
+    def set(self, payload: bytes, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while computing - the value may be stale
+                return
+            self._payload = payload
+            self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._payload = None
+
+
+stats_cache = StatsCache(ttl_seconds=settings.STATS_CACHE_TTL_SECONDS)
+
+
+def invalidate_stats_cache() -> None:
+    """Drop this worker's cached stats (other workers expire by TTL)"""
+    stats_cache.invalidate()
+
+
+async def get_patient_stats_json_async(db: AsyncSession) -> bytes:
+    """Serialized stats, from the micro-cache when fresh"""
+    payload = stats_cache.get()
+    if payload is not None:
+        return payload
+    generation = stats_cache.generation
+    stats = await db.run_sync(get_patient_stats)
+    with time_serialization("stats"):
+        payload = stats.model_dump_json(by_alias=True).encode("utf-8")
+    stats_cache.set(payload, generation)
+    return payload
+
+
+async def _reconcile(session_factory, max_age_seconds: Optional[float]) -> None:
+    try:
+        async with session_factory() as db:
+            if await db.run_sync(reconcile_patient_stats, max_age_seconds):
+                logger.info("Reconciled patient_stats")
+    except Exception:
+        logger.exception("patient_stats reconciliation failed")
+
+
+async def run_stats_reconciler(
+    session_factory,
+    interval_seconds: Optional[float] = None,
+    reconcile_now: Optional[bool] = None,
+) -> None:
+    """
+    Reconcile patient_stats now (unless STATS_RECONCILE_ON_STARTUP is off)
+    and then every interval (background task)
+
+    Every worker runs this, but only rebuilds once the last rebuild by any
+    of them is an interval old: it checks that (one row) every quarter
+    interval, so the table is rebuilt about once per interval in total.
+    Errors are logged and retried on the next check.
+    """
+    interval_seconds = interval_seconds or settings.STATS_RECONCILE_SECONDS
+    if reconcile_now is None:
+        reconcile_now = settings.STATS_RECONCILE_ON_STARTUP
+    if reconcile_now:
+        await _reconcile(session_factory, None)
+    while True:
+        await asyncio.sleep(interval_seconds / 4)
+        await _reconcile(session_factory, interval_seconds)
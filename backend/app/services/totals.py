@@ -0,0 +1,229 @@
+"""
+Totals service - Row counts for paginated patient lists
+
+A full ``COUNT(*)`` over the filtered set is often slower than fetching the
+page itself, so list totals come from one of three sources:
+
+- exact: ``COUNT`` of the filtered query
+- estimate: the planner's row estimate (``pg_class.reltuples`` for the
+  unfiltered table, ``EXPLAIN`` for filtered queries)
+- auto: the planner estimate when it is above ``COUNT_ESTIMATE_THRESHOLD``,
+  otherwise an exact count. While the whole table's estimate is below the
+  threshold no filtered subset can reach it, so the ``EXPLAIN`` is skipped
+  and the count is exact.
+
+Exact counts and auto-mode decisions (the total and whether it is an
+estimate) are cached per normalized filter signature and validated against
+the patient list version. The table estimate is cached per process for
+``COUNT_CACHE_TTL_SECONDS``.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from .. import models
+from ..core.config import settings
+
+COUNT_MODES = ("auto", "exact", "estimate")
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, compiled by the active dialect"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainJSON, "postgresql")
+def _compile_explain_json(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def filter_signature(**filters: Any) -> str:
+    """
+    Build a stable signature for a set of list filters
+
+    Empty values are dropped, strings are trimmed and lists are sorted, so
+    equivalent requests share one cache entry. Case is kept: the status and
+    JSONB array filters are case-sensitive.
+    """
+    normalized: Dict[str, Any] = {}
+    for key, value in filters.items():
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(str(v).strip() for v in value)
+        normalized[key] = value
+    raw = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TotalsCache:
+    """
+    In-process LRU cache of (total, is_estimate) keyed by filter signature
+
+    Each entry records the patient list version it was counted at and is
+    only served for that version, so a write made through any worker
+    process retires it (as with the facets cache). Writes in this process
+    also clear the cache and bump a generation counter, so a count computed
+    concurrently with a local write is never stored as fresh. Entries also
+    expire after a TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, int, float, Tuple[int, bool]]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, signature: str, version: str) -> Optional[Tuple[int, bool]]:
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None:
+                return None
+            entry_version, generation, expires_at, total = entry
+            if entry_version != version or generation != self._generation or expires_at < time.monotonic():
+                del self._entries[signature]
+                return None
+            self._entries.move_to_end(signature)
+            return total
+
+    def set(self, signature: str, version: str, total: Tuple[int, bool], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                # A write happened while counting - the value may be stale
+                return
+            self._entries[signature] = (version, generation, time.monotonic() + self.ttl_seconds, total)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+totals_cache = TotalsCache(
+    ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS,
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES,
+)
+
+
+def invalidate_patient_totals() -> None:
+    """
+    Drop this process's cached counts after a patient create/update
+
+    Other workers notice the write through the list version instead.
+    """
+    totals_cache.invalidate()
+
+
+def estimate_table_rows(db: Session, table_name: str) -> Optional[int]:
+    """
+    Return the planner's row estimate for a whole table
+
+    Returns None when the table has never been analyzed.
+    """
+    reltuples = db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    ).scalar()
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+_table_rows: Dict[str, Tuple[float, Optional[int]]] = {}
+
+
+def cached_table_rows(db: Session, table_name: str) -> Optional[int]:
+    """
+    estimate_table_rows, cached per process for COUNT_CACHE_TTL_SECONDS
+
+    reltuples only moves when the table is vacuumed or analyzed.
+    """
+    entry = _table_rows.get(table_name)
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+    rows = estimate_table_rows(db, table_name)
+    _table_rows[table_name] = (time.monotonic() + settings.COUNT_CACHE_TTL_SECONDS, rows)
+    return rows
+
+
+def estimate_query_rows(db: Session, query: Query) -> int:
+    """Return the planner's row estimate for a query via EXPLAIN"""
+    statement = query.order_by(None).limit(None).offset(None).statement
+    result = db.execute(ExplainJSON(statement)).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def exact_count(db: Session, query: Query) -> int:
+    """COUNT the filtered set, selecting only the primary key"""
+    return query.with_entities(models.Patient.id).order_by(None).count()
+
+
+def get_total(
+    db: Session,
+    query: Query,
+    signature: str,
+    version: str,
+    filtered: bool,
+    mode: str = "auto",
+) -> Tuple[int, bool]:
+    """
+    Get the total for a filtered patient query
+
+    Args:
+        db: Database session
+        query: Filtered query, before sorting and pagination
+        signature: Normalized filter signature (see filter_signature)
+        version: Patient list version (services.patients.get_patient_list_version)
+        filtered: Whether any filter/search is applied
+        mode: auto, exact or estimate (see module docstring)
+
+    Returns:
+        (total, is_estimate)
+    """
+    if mode != "estimate":
+        cached = totals_cache.get(signature, version)
+        # A cached auto-mode estimate doesn't answer an exact request
+        if cached is not None and not (cached[1] and mode == "exact"):
+            return cached
+
+    generation = totals_cache.generation
+    if mode != "exact":
+        table_rows = cached_table_rows(db, "patients")
+        if mode == "auto" and filtered and table_rows is not None and table_rows < settings.COUNT_ESTIMATE_THRESHOLD:
+            # No subset of a table below the threshold can reach it: count exactly
+            estimate = None
+        elif not filtered and table_rows is not None:
+            estimate = table_rows
+        else:
+            estimate = estimate_query_rows(db, query)
+        if estimate is not None and (mode == "estimate" or estimate >= settings.COUNT_ESTIMATE_THRESHOLD):
+            if mode == "auto":
+                totals_cache.set(signature, version, (estimate, True), generation)
+            return estimate, True
+
+    total = exact_count(db, query)
+    totals_cache.set(signature, version, (total, False), generation)
+    return total, False
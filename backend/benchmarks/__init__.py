@@ -0,0 +1 @@
+# Performance benchmarks (run against a seeded database, see README.md)
@@ -0,0 +1,422 @@
+"""
+Benchmark: end-to-end HTTP load against the real FastAPI app
+
+Seeds Postgres with a fixed dataset, starts the API with uvicorn (or targets
+a running server with --base-url) and drives it with a concurrent HTTP load
+generator. Scenarios cover the patient list, search, every list filter, deep
+offset pages, cursor pages, detail and every PATCH endpoint. Each scenario
+runs a fixed number of requests at a fixed concurrency after a warm-up, and
+the results (p50/p95/p99 latency, throughput, status codes) are printed as
+JSON so runs can be diffed or compared with --compare.
+
+Datasets are reproducible: --size 10k / 100k / 1m loads exactly that many
+patients with the fast generator (seed 42, reference date 2025-01-01). A
+database holding a different number of patients is only replaced with
+--reseed, which truncates the patient tables first. PATCH scenarios run last
+and write to the sampled patients (values are rewritten to the same set of
+fixtures, so repeated runs see the same data shape).
+
+The server runs with the environment's settings, caches included: identical
+list requests are coalesced and details are cached. Set
+LIST_COALESCE_TTL_SECONDS=0 and CACHE_BACKEND=none to measure the uncached
+query paths.
+
+Requires httpx (pip install httpx). Run from backend/:
+    DATABASE_URL=postgresql://... python -m benchmarks.api_load --size 100k
+    python -m benchmarks.api_load --size 100k --scenario list_default --scenario detail
+    python -m benchmarks.api_load --size 100k --output after.json --compare before.json
+"""
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional benchmark dependency
+    raise SystemExit("benchmarks.api_load requires httpx (pip install httpx)")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SEED = 42
+AS_OF = date(2025, 1, 1)
+
+LOGIN = {"email": "doctor@example.com", "password": "doctor123"}
+
+# Fixed values from the generator's pools
+FILTER_VALUES = {
+    "status": "critical",
+    "blood_type": "O-",
+    "insurance_provider": "Aetna",
+    "allergies": "Penicillin",
+    "current_medications": "Metformin",
+    "conditions": "Hypertension",
+    "last_visit": "last_month",
+}
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+# -- Dataset --------------------------------------------------------------------
+
+
+def seed_database(count: int, reseed: bool = False, workers: Optional[int] = None) -> int:
+    """Make sure the database holds exactly ``count`` generated patients"""
+    from sqlalchemy import text
+
+    from app.core.database import get_engine
+    from app.generate_data_fast import generate_patients_fast
+    from app.migrations import migrate
+
+    engine = get_engine()
+    migrate(engine)
+    with engine.connect() as connection:
+        existing = connection.execute(text("SELECT count(*) FROM patients")).scalar()
+    if existing == count and not reseed:
+        print(f"Using existing dataset ({existing} patients)", file=sys.stderr)
+        return existing
+    if existing and not reseed:
+        raise SystemExit(
+            f"Database holds {existing} patients, expected {count}. "
+            "Pass --reseed to truncate the patient tables and regenerate."
+        )
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE patients, medications, documents, patient_stats"))
+    print(f"Seeding {count} patients...", file=sys.stderr)
+    generate_patients_fast(count, seed=SEED, workers=workers, as_of=AS_OF)
+    engine.dispose()
+    return count
+
+
+# -- Server ---------------------------------------------------------------------
+
+
+def start_server(port: int, workers: int = 1) -> subprocess.Popen:
+    """Run the app with uvicorn in a child process and wait until it answers"""
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    process = subprocess.Popen(command, env=os.environ.copy())
+    wait_until_healthy(process, port)
+    return process
+
+
+def wait_until_healthy(process: subprocess.Popen, port: int, timeout: float = 120) -> None:
+    """Wait for a started server to answer /health (terminate it on timeout)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"API server did not become healthy within {timeout:.0f}s")
+
+
+# -- Scenarios ------------------------------------------------------------------
+
+
+class Fixtures:
+    """Patient ids, search/filter values and page positions sampled from the running API"""
+
+    def __init__(self, patient_ids: List[str], last_names: List[str], cities: List[str], states: List[str],
+                 total_pages: int, deep_cursor: Optional[str]):
+        self.patient_ids = patient_ids
+        self.last_names = last_names
+        self.cities = cities
+        self.states = states
+        self.total_pages = total_pages
+        self.deep_cursor = deep_cursor
+
+
+async def load_fixtures(client: httpx.AsyncClient, sample_size: int = 200, cursor_pages: int = 20) -> Fixtures:
+    response = await client.get("/patients")
+    response.raise_for_status()
+    total_pages = response.json()["total_pages"]
+
+    patient_ids: List[str] = []
+    last_names: List[str] = []
+    page = 1
+    while len(patient_ids) < sample_size:
+        response = await client.get("/patients", params={"page": page, "page_size": 100})
+        response.raise_for_status()
+        items = response.json()["items"]
+        if not items:
+            break
+        patient_ids.extend(item["id"] for item in items)
+        last_names.extend(item["last_name"] for item in items)
+        page += 1
+    if not patient_ids:
+        raise SystemExit("No patients found - seed the database first (--size)")
+    patient_ids = patient_ids[:sample_size]
+
+    cities, states = [], []
+    for patient_id in patient_ids[:20]:
+        response = await client.get(f"/patients/{patient_id}")
+        response.raise_for_status()
+        address = response.json()["address"]
+        cities.append(address["city"])
+        states.append(address["state"])
+
+    # Cursor for page cursor_pages + 1 of the default view
+    cursor = None
+    for _ in range(cursor_pages):
+        params = {"page_size": 25, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/patients", params=params)
+        response.raise_for_status()
+        cursor = response.json().get("nextCursor")
+        if not cursor:
+            break
+
+    return Fixtures(patient_ids, sorted(set(last_names)), cities, states, total_pages, cursor)
+
+
+def build_scenarios(fixtures: Fixtures) -> Dict[str, Callable[[random.Random], Request]]:
+    """Scenario name -> request factory (method, path, params or JSON body)"""
+    ids = fixtures.patient_ids
+    deep_page = max(1, fixtures.total_pages - 1)
+    middle_page = max(1, fixtures.total_pages // 2)
+
+    def list_request(**params):
+        return lambda rng: ("GET", "/patients", params)
+
+    scenarios: Dict[str, Callable[[random.Random], Request]] = {
+        "list_default": list_request(),
+        "list_page_size_100": list_request(page_size=100),
+        "list_sort_last_name": list_request(sort_by="lastName", sort_order="asc"),
+        "search_last_name": lambda rng: ("GET", "/patients", {"search": rng.choice(fixtures.last_names)}),
+        "search_prefix": lambda rng: ("GET", "/patients", {"search": rng.choice(fixtures.last_names)[:3]}),
+        "search_relevance": lambda rng: (
+            "GET", "/patients", {"search": rng.choice(fixtures.last_names), "sort_by": "relevance"}
+        ),
+    }
+    for name, value in FILTER_VALUES.items():
+        scenarios[f"filter_{name}"] = list_request(**{name: value})
+    scenarios["filter_city"] = lambda rng: ("GET", "/patients", {"city": rng.choice(fixtures.cities)})
+    scenarios["filter_state"] = lambda rng: ("GET", "/patients", {"state": rng.choice(fixtures.states)})
+    scenarios["filter_allergies_all"] = list_request(
+        allergies=["Penicillin", "Latex"], allergies_match="all"
+    )
+    scenarios["filter_combined"] = list_request(
+        status="active", insurance_provider="Aetna", conditions="Hypertension"
+    )
+    scenarios["deep_page_middle"] = list_request(page=middle_page)
+    scenarios["deep_page_last"] = list_request(page=deep_page)
+    if fixtures.deep_cursor:
+        scenarios["cursor_page"] = list_request(cursor=fixtures.deep_cursor)
+    scenarios["detail"] = lambda rng: ("GET", f"/patients/{rng.choice(ids)}", None)
+
+    # Writes (run last; bodies come from small fixed sets)
+    scenarios["patch_personal_info"] = lambda rng: (
+        "PATCH", f"/patients/{rng.choice(ids)}/personal-info",
+        {"phone": f"555-{rng.randint(100, 999)}-{rng.randint(0, 9999):04d}"},
+    )
+    scenarios["patch_emergency_contact"] = lambda rng: (
+        "PATCH", f"/patients/{rng.choice(ids)}/emergency-contact",
+        {"name": rng.choice(["Alex Kim", "Sam Lee", "Jordan Diaz"]), "relationship": "Sibling"},
+    )
+    scenarios["patch_insurance"] = lambda rng: (
+        "PATCH", f"/patients/{rng.choice(ids)}/insurance",
+        {"copay": rng.choice([10, 20, 30, 40]), "deductible": rng.choice([500, 1000, 2500])},
+    )
+    scenarios["patch_medical_info"] = lambda rng: (
+        "PATCH", f"/patients/{rng.choice(ids)}/medical-info",
+        {"allergies": rng.sample(["Peanuts", "Latex", "Pollen", "Dairy"], 2),
+         "conditions": rng.sample(["Asthma", "Hypertension", "Migraine"], 1)},
+    )
+    scenarios["patch_medications"] = lambda rng: (
+        "PATCH", f"/patients/{rng.choice(ids)}/medications",
+        {"medications": [{
+            "name": "Lisinopril", "dosage": "10mg", "frequency": "Once daily",
+            "prescribed_by": "Dr. Smith", "start_date": "2024-01-15",
+        }]},
+    )
+    return scenarios
+
+
+# -- Load generator -------------------------------------------------------------
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-fraction * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _send(client: httpx.AsyncClient, request: Request) -> int:
+    method, path, payload = request
+    if method == "GET":
+        response = await client.get(path, params=payload)
+    else:
+        response = await client.request(method, path, json=payload)
+    # Read the whole body: serialization and transfer are part of the latency
+    await response.aread()
+    return response.status_code
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    factory: Callable[[random.Random], Request],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """Closed-loop load: ``concurrency`` workers share ``requests`` requests"""
+    rng = random.Random(seed)
+    planned = [factory(rng) for _ in range(warmup + requests)]
+    for request in planned[:warmup]:
+        await _send(client, request)
+
+    queue = iter(planned[warmup:])
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for request in queue:
+            start = time.perf_counter()
+            try:
+                status = str(await _send(client, request))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not status.startswith("2"):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(
+    base_url: str,
+    requests: int = 500,
+    concurrency: int = 20,
+    warmup: int = 20,
+    scenarios: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/auth/login", json=LOGIN)
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        fixtures = await load_fixtures(client)
+        available = build_scenarios(fixtures)
+        unknown = set(scenarios or ()) - set(available)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}. Available: {', '.join(available)}")
+
+        results = {}
+        for index, (name, factory) in enumerate(available.items()):
+            if scenarios and name not in scenarios:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = await run_scenario(client, factory, requests, concurrency, warmup, SEED + index)
+
+    return {
+        "meta": {
+            "base_url": base_url,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "requests_per_scenario": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "sampled_patients": len(fixtures.patient_ids),
+            "total_pages": fixtures.total_pages,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-scenario ratio current / baseline for latency percentiles and throughput"""
+    deltas = {}
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas[name] = {
+            key: round(result[key] / before[key], 3) if before[key] else None
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+    return deltas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP load benchmark for the patients API")
+    parser.add_argument("--size", choices=sorted(SIZES), help="Seed this dataset size before running")
+    parser.add_argument("--reseed", action="store_true", help="Truncate and regenerate the patient tables")
+    parser.add_argument("--seed-workers", type=int, default=None, help="Generator processes (default: CPU count)")
+    parser.add_argument("--base-url", default=None, help="Target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the started server (default 8765)")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes (default 1)")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario (default 500)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent connections (default 20)")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario (default 20)")
+    parser.add_argument("--scenario", action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    parser.add_argument("--compare", default=None, help="Baseline results file to compare against")
+    args = parser.parse_args()
+
+    patients = seed_database(SIZES[args.size], args.reseed, args.seed_workers) if args.size else None
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = start_server(args.port, args.server_workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        report = asyncio.run(run(base_url, args.requests, args.concurrency, args.warmup, args.scenario))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report["meta"]["size"] = args.size
+    report["meta"]["patients"] = patients
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = compare(json.load(f), report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
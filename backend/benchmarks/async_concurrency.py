@@ -0,0 +1,96 @@
+"""
+Benchmark: blocking sync Session vs AsyncSession on one event loop
+
+Fires batches of concurrent list/detail requests at the service layer from a
+single asyncio loop, the way uvicorn runs ``async def`` endpoints:
+
+- blocking: sync Session called directly inside the coroutine (previous
+  endpoint behaviour - every round trip blocks the loop)
+- async: AsyncSession + the *_async service functions (current behaviour)
+
+Run from backend/ against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.async_concurrency [requests]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from app import models
+from app.core.database import AsyncSessionLocal, SessionLocal, get_async_engine
+from app.services.patients import (
+    get_paginated_patients,
+    get_paginated_patients_async,
+    get_patient_by_id,
+    get_patient_by_id_async,
+)
+
+CONCURRENCY_LEVELS = (1, 10, 50)
+
+
+async def blocking_request(patient_id: str, page: int):
+    db = SessionLocal()
+    try:
+        get_paginated_patients(db, page=page, page_size=25)
+        get_patient_by_id(db, patient_id)
+    finally:
+        db.close()
+
+
+async def async_request(patient_id: str, page: int):
+    async with AsyncSessionLocal() as db:
+        await get_paginated_patients_async(db, page=page, page_size=25)
+        await get_patient_by_id_async(db, patient_id)
+
+
+async def _run_level(handler, patient_ids, total_requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(patient_ids[i % len(patient_ids)], (i % 40) + 1)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+async def run(total_requests: int = 500):
+    db = SessionLocal()
+    try:
+        patient_ids = [row.id for row in db.query(models.Patient.id).limit(200).all()]
+    finally:
+        db.close()
+    if not patient_ids:
+        raise SystemExit("No patients found - seed the database first (python -m app.generate_data)")
+
+    # Warm up both pools
+    await _run_level(blocking_request, patient_ids, 20, 5)
+    await _run_level(async_request, patient_ids, 20, 5)
+
+    results = []
+    for concurrency in CONCURRENCY_LEVELS:
+        blocking = await _run_level(blocking_request, patient_ids, total_requests, concurrency)
+        non_blocking = await _run_level(async_request, patient_ids, total_requests, concurrency)
+        results.append({
+            "concurrency": concurrency,
+            "blocking_sync_session": blocking,
+            "async_session": non_blocking,
+        })
+    await get_async_engine().dispose()
+    return {"requests_per_level": total_requests, "results": results}
+
+
+if __name__ == "__main__":
+    total_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(json.dumps(asyncio.run(run(total_requests)), indent=2))
@@ -0,0 +1,91 @@
+"""
+Benchmark: thundering herd on the default patient list view
+
+Fires bursts of identical concurrent requests for the default dashboard view
+(page 1, sort_by=createdAt desc, no filters), each on its own AsyncSession
+like separate HTTP requests:
+
+- independent: every request runs its own count + page queries
+- coalesced: requests share one execution through the single-flight layer
+  (get_paginated_patients_coalesced_async, keyed by the list ETag)
+
+The kept-result TTL is disabled between bursts so every burst starts cold.
+
+Run from backend/ against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.list_coalescing [bursts]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from app.core.database import AsyncSessionLocal, get_async_engine
+from app.core.singleflight import patient_list_flight
+from app.services.patients import (
+    get_paginated_patients_async,
+    get_paginated_patients_coalesced_async,
+    get_patient_list_version_async,
+    patient_list_etag,
+)
+
+BURST_SIZES = (10, 50, 100)
+DEFAULT_VIEW = dict(page=1, page_size=25, sort_by="createdAt", sort_order="desc")
+
+
+async def independent_request():
+    async with AsyncSessionLocal() as db:
+        await get_paginated_patients_async(db, **DEFAULT_VIEW)
+
+
+async def coalesced_request():
+    async with AsyncSessionLocal() as db:
+        version = await get_patient_list_version_async(db)
+        key = patient_list_etag(version, **DEFAULT_VIEW)
+        await get_paginated_patients_coalesced_async(db, key=key, **DEFAULT_VIEW)
+
+
+async def _run_bursts(handler, bursts: int, burst_size: int):
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await handler()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    executions_before = patient_list_flight.executions
+    start = time.perf_counter()
+    for _ in range(bursts):
+        patient_list_flight.clear()
+        await asyncio.gather(*(one() for _ in range(burst_size)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput_rps": round(bursts * burst_size / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "list_executions": patient_list_flight.executions - executions_before,
+    }
+
+
+async def run(bursts: int = 10):
+    # Warm up the pool
+    await _run_bursts(independent_request, 1, 5)
+
+    results = []
+    for burst_size in BURST_SIZES:
+        independent = await _run_bursts(independent_request, bursts, burst_size)
+        independent["list_executions"] = bursts * burst_size
+        coalesced = await _run_bursts(coalesced_request, bursts, burst_size)
+        results.append({
+            "burst_size": burst_size,
+            "independent": independent,
+            "coalesced": coalesced,
+        })
+    await get_async_engine().dispose()
+    return {"bursts_per_size": bursts, "results": results}
+
+
+if __name__ == "__main__":
+    bursts = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(json.dumps(asyncio.run(run(bursts)), indent=2))
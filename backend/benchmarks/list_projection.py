@@ -0,0 +1,81 @@
+"""
+Benchmark: ORM entity list query vs column-projected list query
+
+Compares loading full Patient entities and copying fields into
+PatientListItem against selecting only the list columns as row tuples.
+
+Run from backend/ against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.list_projection [iterations]
+"""
+import json
+import statistics
+import sys
+import time
+
+from app import models
+from app.core.database import SessionLocal
+from app.services.patients import PATIENT_LIST_COLUMNS, row_to_list_item
+
+PAGE_SIZES = (25, 100)
+
+
+def _ordered(query):
+    return query.order_by(models.Patient.created_at.desc(), models.Patient.id.desc())
+
+
+def load_entities(db, page_size: int, offset: int):
+    """Previous list path: hydrate full Patient entities"""
+    patients = _ordered(db.query(models.Patient)).offset(offset).limit(page_size).all()
+    return [row_to_list_item(patient) for patient in patients]
+
+
+def load_projected(db, page_size: int, offset: int):
+    """Current list path: select only the list columns"""
+    rows = _ordered(db.query(*PATIENT_LIST_COLUMNS)).offset(offset).limit(page_size).all()
+    return [row_to_list_item(row) for row in rows]
+
+
+def _time_path(loader, page_size: int, iterations: int, total: int):
+    timings = []
+    db = SessionLocal()
+    try:
+        for i in range(iterations):
+            offset = (i * page_size) % max(total - page_size, 1)
+            start = time.perf_counter()
+            loader(db, page_size, offset)
+            timings.append((time.perf_counter() - start) * 1000)
+            # Start each iteration with an empty identity map, like a new request
+            db.expunge_all()
+    finally:
+        db.close()
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+    }
+
+
+def run(iterations: int = 200):
+    db = SessionLocal()
+    try:
+        total = db.query(models.Patient.id).count()
+    finally:
+        db.close()
+
+    results = {"patients": total, "iterations": iterations, "results": []}
+    for page_size in PAGE_SIZES:
+        entities = _time_path(load_entities, page_size, iterations, total)
+        projected = _time_path(load_projected, page_size, iterations, total)
+        results["results"].append({
+            "page_size": page_size,
+            "orm_entities": entities,
+            "projected_columns": projected,
+            "speedup": round(entities["median_ms"] / projected["median_ms"], 2) if projected["median_ms"] else None,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(json.dumps(run(iterations), indent=2))
@@ -0,0 +1,293 @@
+"""
+Query-plan regression check for the patient list
+
+Runs get_paginated_patients for every filter on its own, every pair of
+filters, every sort key in both directions and deep offset / cursor pages,
+captures the SQL it issues and runs ``EXPLAIN (FORMAT JSON)`` on each
+statement against the seeded database. A case fails when a plan contains a
+Seq Scan on patients or medications that
+
+- reads a table holding at least --min-table-rows rows (planner estimate), and
+- keeps less than --max-selectivity of it (a scan that returns most of the
+  table is the right plan, e.g. counting status=active)
+
+and when a selective case doesn't use the index meant for it: each filter's
+own index (EXPECTED_FILTER_INDEXES), and for unfiltered sorts the (sort
+column, id) index.
+
+Exits with status 1 when any case fails. tests/test_query_guards.py runs the
+same check under pytest, so CI fails on a plan regression after a seed
+(``python -m app.generate_data 100000 --fast``). Known, accepted scans can
+be listed with --allow (fnmatch patterns on case names).
+
+Run from backend/ against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --min-table-rows 50000 --allow 'city*'
+"""
+from fnmatch import fnmatch
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import json
+import re
+import sys
+
+from sqlalchemy import event, text
+
+from app import models
+from app.core.database import SessionLocal, get_engine
+from app.core.query_stats import fingerprint_statement
+from app.services.patients import SORT_COLUMNS, get_paginated_patients
+from app.services.totals import invalidate_patient_totals
+
+CHECKED_TABLES = ("patients", "medications")
+_CHECKED_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+(?:patients|medications)\b", re.IGNORECASE)
+
+Case = Tuple[str, Dict[str, Any]]
+
+# Index (any of) serving each filter in sample_filter_values, when selective
+EXPECTED_FILTER_INDEXES = {
+    "search_name": ("ix_patients_search_name_trgm",),
+    "search_email": ("ix_patients_search_email_trgm",),
+    "search_phone": ("ix_patients_search_phone_trgm",),
+    "status": ("ix_patients_status_id",),
+    "blood_type": ("ix_patients_blood_type_id",),
+    "city": ("ix_patients_address_city_trgm",),
+    "state": ("ix_patients_address_state_trgm",),
+    "insurance_provider": ("ix_patients_insurance_provider_trgm", "ix_patients_insurance_provider_id"),
+    "allergies_any": ("ix_patients_allergies_gin",),
+    "allergies_all": ("ix_patients_allergies_gin",),
+    "conditions_any": ("ix_patients_conditions_gin",),
+    "conditions_all": ("ix_patients_conditions_gin",),
+    "current_medications": ("ix_medications_active_patient_name",),
+    "last_visit": ("ix_patients_last_visit",),
+}
+# Composite (sort column, id) index walked by unfiltered first / cursor pages
+EXPECTED_SORT_INDEXES = {sort_by: f"ix_patients_{column.key}_id" for sort_by, column in SORT_COLUMNS.items()}
+
+
+def sample_filter_values(db) -> Dict[str, Dict[str, Any]]:
+    """One value per list filter, taken from a real patient where needed"""
+    patient = db.query(models.Patient).order_by(models.Patient.id).first()
+    if patient is None:
+        raise SystemExit("No patients found - seed the database first (python -m app.generate_data)")
+    return {
+        "search_name": {"search": patient.last_name},
+        "search_email": {"search": patient.email.split("@")[0]},
+        "search_phone": {"search": patient.phone[-7:]},
+        "status": {"status": "critical"},
+        "blood_type": {"blood_type": "O-"},
+        "city": {"city": patient.address_city},
+        "state": {"state": patient.address_state},
+        "insurance_provider": {"insurance_provider": ["Aetna"]},
+        "allergies_any": {"allergies": ["Penicillin", "Latex"]},
+        "allergies_all": {"allergies": ["Penicillin", "Latex"], "allergies_match": "all"},
+        "conditions_any": {"conditions": ["Hypertension"]},
+        "conditions_all": {"conditions": ["Hypertension", "Asthma"], "conditions_match": "all"},
+        "current_medications": {"current_medications": ["Metformin"]},
+        "last_visit": {"last_visit": "last_week"},
+    }
+
+
+def plan_cases(filter_values: Dict[str, Dict[str, Any]]) -> Iterator[Case]:
+    """Every (case name, get_paginated_patients kwargs) to check"""
+    # Sorts and page positions, unfiltered
+    for sort_by in SORT_COLUMNS:
+        for sort_order in ("asc", "desc"):
+            yield f"sort_{sort_by}_{sort_order}", {"sort_by": sort_by, "sort_order": sort_order}
+            yield f"sort_{sort_by}_{sort_order}_page_200", {"sort_by": sort_by, "sort_order": sort_order, "page": 200}
+            yield f"sort_{sort_by}_{sort_order}_cursor", {"sort_by": sort_by, "sort_order": sort_order, "cursor": True}
+
+    # Each filter with each sort
+    for name, values in filter_values.items():
+        for sort_by in SORT_COLUMNS:
+            yield f"{name}_sort_{sort_by}", {**values, "sort_by": sort_by}
+        if "search" in values:
+            yield f"{name}_sort_relevance", {**values, "sort_by": "relevance"}
+
+    # Every pair of filters (default sort); skip pairs setting the same parameter
+    for (name_a, values_a), (name_b, values_b) in combinations(filter_values.items(), 2):
+        if set(values_a) & set(values_b):
+            continue
+        yield f"{name_a}+{name_b}", {**values_a, **values_b}
+
+
+def capture_statements(db, params: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """Run the list request and return the (statement, parameters) it executed"""
+    captured: List[Tuple[str, Any]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    params = dict(params)
+    invalidate_patient_totals()
+    if params.pop("cursor", None):
+        # A real cursor: the one the first page hands out
+        first_page = get_paginated_patients(db, **params)
+        params["cursor"] = first_page.nextCursor
+        if not params["cursor"]:
+            return []
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        get_paginated_patients(db, **params)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return [
+        (statement, parameters) for statement, parameters in captured
+        if not statement.lstrip().upper().startswith("EXPLAIN") and _CHECKED_TABLE_PATTERN.search(statement)
+    ]
+
+
+def explain(db, statement: str, parameters: Any) -> Dict[str, Any]:
+    """EXPLAIN (FORMAT JSON) a captured statement with its parameters"""
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return plan[0]["Plan"]
+
+
+def iter_plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from iter_plan_nodes(child)
+
+
+def expected_indexes(case_name: str) -> Tuple[str, ...]:
+    """Indexes (any of) a selective case's plans should use; () when unchecked"""
+    for name, indexes in EXPECTED_FILTER_INDEXES.items():
+        if case_name.startswith(f"{name}_sort_"):
+            return indexes
+    for sort_by, index in EXPECTED_SORT_INDEXES.items():
+        for sort_order in ("asc", "desc"):
+            if case_name in (f"sort_{sort_by}_{sort_order}", f"sort_{sort_by}_{sort_order}_cursor"):
+                return (index,)
+    return ()
+
+
+def index_violation(
+    case_name: str,
+    plans: Sequence[Dict[str, Any]],
+    table_rows: Dict[str, float],
+    min_table_rows: float,
+    max_selectivity: float,
+) -> Optional[Dict[str, Any]]:
+    """The expected index when a selective case's plans don't use it, else None"""
+    indexes = expected_indexes(case_name)
+    if not indexes or not plans:
+        return None
+    table = indexes[0].split("_")[1]
+    rows = table_rows.get(table)
+    if rows is None or rows < min_table_rows:
+        return None
+    nodes = [node for plan in plans for node in iter_plan_nodes(plan)]
+    if not case_name.startswith("sort_"):
+        # Filters: only checked while they keep a small part of the table
+        scanned = [node.get("Plan Rows", 0) for node in nodes if node.get("Relation Name") == table]
+        if scanned and max(scanned) / rows >= max_selectivity:
+            return None
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    if used & set(indexes):
+        return None
+    return {"expected_index": " or ".join(indexes), "used_indexes": sorted(used)}
+
+
+def seq_scan_violations(
+    plan: Dict[str, Any],
+    table_rows: Dict[str, float],
+    min_table_rows: float,
+    max_selectivity: float,
+) -> List[Dict[str, Any]]:
+    """Seq Scans on the checked tables that read a large table to keep little of it"""
+    violations = []
+    for node in iter_plan_nodes(plan):
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        relation = node.get("Relation Name")
+        rows = table_rows.get(relation)
+        if relation not in CHECKED_TABLES or rows is None or rows < min_table_rows:
+            continue
+        selectivity = node.get("Plan Rows", 0) / rows if rows else 0.0
+        if selectivity < max_selectivity:
+            violations.append({
+                "table": relation,
+                "table_rows": int(rows),
+                "plan_rows": node.get("Plan Rows"),
+                "selectivity": round(selectivity, 4),
+                "filter": node.get("Filter"),
+            })
+    return violations
+
+
+def estimated_table_rows(db) -> Dict[str, float]:
+    """Planner row estimates (pg_class.reltuples) for the checked tables"""
+    rows = dict(db.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"),
+        {"names": list(CHECKED_TABLES)},
+    ).all())
+    unanalyzed = [name for name in CHECKED_TABLES if rows.get(name, -1) < 0]
+    if unanalyzed:
+        raise SystemExit(f"No planner statistics for {', '.join(unanalyzed)} - run ANALYZE first")
+    return rows
+
+
+def run(
+    min_table_rows: float = 10_000,
+    max_selectivity: float = 0.1,
+    allow: Sequence[str] = (),
+    only: Optional[str] = None,
+) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        table_rows = estimated_table_rows(db)
+        cases = list(plan_cases(sample_filter_values(db)))
+        if only:
+            cases = [case for case in cases if fnmatch(case[0], only)]
+
+        failures, allowed = [], []
+        statements = 0
+        for name, params in cases:
+            entries, plans = [], []
+            for statement, parameters in capture_statements(db, params):
+                statements += 1
+                plan = explain(db, statement, parameters)
+                plans.append(plan)
+                violations = seq_scan_violations(plan, table_rows, min_table_rows, max_selectivity)
+                if violations:
+                    entries.append({"case": name, "statement": fingerprint_statement(statement), "seq_scans": violations})
+            missing_index = index_violation(name, plans, table_rows, min_table_rows, max_selectivity)
+            if missing_index:
+                entries.append({"case": name, **missing_index})
+            if any(fnmatch(name, pattern) for pattern in allow):
+                allowed.extend(entries)
+            else:
+                failures.extend(entries)
+            db.rollback()
+    finally:
+        db.close()
+
+    return {
+        "table_rows": {name: int(rows) for name, rows in table_rows.items()},
+        "min_table_rows": min_table_rows,
+        "max_selectivity": max_selectivity,
+        "cases": len(cases),
+        "statements": statements,
+        "failures": failures,
+        "allowed": allowed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail on sequential scans in patient list query plans")
+    parser.add_argument("--min-table-rows", type=float, default=10_000,
+                        help="Ignore Seq Scans on tables smaller than this (default 10000)")
+    parser.add_argument("--max-selectivity", type=float, default=0.1,
+                        help="Flag Seq Scans keeping less than this fraction of the table (default 0.1)")
+    parser.add_argument("--allow", action="append", default=[], help="Accept violations in cases matching this pattern")
+    parser.add_argument("--case", default=None, help="Only check cases matching this pattern")
+    args = parser.parse_args()
+
+    report = run(args.min_table_rows, args.max_selectivity, args.allow, args.case)
+    print(json.dumps(report, indent=2, default=str))
+    if report["failures"]:
+        print(f"{len(report['failures'])} plan regression(s): sequential scans or unused indexes", file=sys.stderr)
+        sys.exit(1)
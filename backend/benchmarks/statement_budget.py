@@ -0,0 +1,21 @@
+"""
+SQL statement budget check for the patient detail and list endpoints
+
+Thin wrapper running the statement budget tests in tests/test_query_guards.py
+(the budgets and cases live there), for CI steps that call the benchmarks. Needs a seeded database
+and the dev requirements (pytest, httpx). Run from backend/:
+    DATABASE_URL=postgresql://... python -m benchmarks.statement_budget [pytest options]
+
+Exits with pytest's status: 1 when a request issues more statements than
+its budget.
+"""
+import os
+import sys
+
+import pytest
+
+TESTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_query_guards.py")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-q", TESTS, "-k", "not query_plans", *sys.argv[1:]]))
@@ -0,0 +1,246 @@
+"""
+Benchmark: throughput scaling from 1 to N gunicorn worker processes
+
+Starts the production launcher (gunicorn.conf.py: preloaded app, uvicorn
+workers, DB_POOL_BUDGET divided across the workers) once per worker count
+and drives each with the same load: several client processes, each running
+a closed loop over 100-patient list pages at random offsets and patient
+details (requests that spend most of their time serializing). Reports time
+to ready, throughput and latency per worker count, and speedup / parallel
+efficiency relative to one worker.
+
+Caches and list coalescing are turned off in the server (CACHE_BACKEND=none,
+LIST_COALESCE_TTL_SECONDS=0) so every request does its full work; pass
+--keep-caches to use the environment's settings instead.
+
+The load generator shares the machine: with C cores, worker counts above
+C minus the client processes compete with the clients for CPU, and the
+curve flattens there for that reason alone.
+
+Needs a seeded database (``python -m benchmarks.api_load --size 100k`` seeds
+one) and httpx. Run from backend/:
+    DATABASE_URL=postgresql://... python -m benchmarks.worker_scaling
+    python -m benchmarks.worker_scaling --workers 1 2 4 8 --clients 4 --requests 4000
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# api_load exits with an install hint when httpx is missing
+from benchmarks.api_load import LOGIN, Request, _git_commit, _send, percentile, wait_until_healthy
+
+import httpx
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+def default_worker_counts() -> List[int]:
+    """1, 2, 4, ... up to the available CPUs (always including the CPU count)"""
+    cpus = available_cpus()
+    counts = []
+    count = 1
+    while count < cpus:
+        counts.append(count)
+        count *= 2
+    return counts + [cpus]
+
+
+def start_gunicorn(port: int, workers: int, env: Dict[str, str]) -> Tuple[subprocess.Popen, float]:
+    """Start gunicorn.conf.py with this many workers; return it and its time to ready"""
+    command = [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning",
+        "app.main:app",
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env={**env, "WEB_CONCURRENCY": str(workers)})
+    wait_until_healthy(process, port)
+    return process, time.perf_counter() - start
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    # SIGTERM: gunicorn drains its workers (graceful_timeout) before exiting
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def sample_targets(base_url: str) -> Tuple[str, List[str], int]:
+    """Access token, patient ids from the first pages and the page count at page_size=100"""
+    response = httpx.post(f"{base_url}/auth/login", json=LOGIN, timeout=30)
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    patient_ids: List[str] = []
+    total_pages = 0
+    for page in (1, 2):
+        response = httpx.get(f"{base_url}/patients", params={"page": page, "page_size": 100}, headers=headers, timeout=60)
+        response.raise_for_status()
+        body = response.json()
+        total_pages = body["total_pages"]
+        patient_ids.extend(item["id"] for item in body["items"])
+    if not patient_ids:
+        raise SystemExit("No patients found - seed the database first (python -m benchmarks.api_load --size 100k)")
+    return token, patient_ids, total_pages
+
+
+def plan_requests(rng: random.Random, count: int, patient_ids: List[str], total_pages: int) -> List[Request]:
+    """Alternating 100-patient list pages (first 50 pages) and patient details"""
+    last_page = max(1, min(total_pages, 50))
+    planned: List[Request] = []
+    for i in range(count):
+        if i % 2 == 0:
+            planned.append(("GET", "/patients", {"page": rng.randint(1, last_page), "page_size": 100}))
+        else:
+            planned.append(("GET", f"/patients/{rng.choice(patient_ids)}", None))
+    return planned
+
+
+async def _client_loop(base_url: str, token: str, planned: List[Request], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        queue = iter(planned)
+
+        async def worker():
+            for request in queue:
+                start = time.perf_counter()
+                try:
+                    status = str(await _send(client, request))
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "statuses": statuses}
+
+
+def run_client(base_url: str, token: str, planned: List[Request], concurrency: int) -> Dict[str, Any]:
+    """One load generator process: closed loop over its planned requests"""
+    return asyncio.run(_client_loop(base_url, token, planned, concurrency))
+
+
+def measure(
+    workers: int,
+    port: int,
+    env: Dict[str, str],
+    clients: int,
+    concurrency: int,
+    requests: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Start the server with this many workers and load it from every client process"""
+    base_url = f"http://127.0.0.1:{port}"
+    server, ready_seconds = start_gunicorn(port, workers, env)
+    try:
+        token, patient_ids, total_pages = sample_targets(base_url)
+        rng = random.Random(42)
+        per_client = max(1, requests // clients)
+        warmup_plans = [plan_requests(rng, warmup, patient_ids, total_pages) for _ in range(clients)]
+        plans = [plan_requests(rng, per_client, patient_ids, total_pages) for _ in range(clients)]
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            # Warm every worker (connections, pools, caches of compiled SQL)
+            list(pool.map(run_client, [base_url] * clients, [token] * clients, warmup_plans, [concurrency] * clients))
+            start = time.perf_counter()
+            results = list(pool.map(run_client, [base_url] * clients, [token] * clients, plans, [concurrency] * clients))
+            elapsed = time.perf_counter() - start
+    finally:
+        stop_server(server)
+
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    statuses: Dict[str, int] = {}
+    for result in results:
+        for status, count in result["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    return {
+        "workers": workers,
+        "ready_seconds": round(ready_seconds, 2),
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_codes": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def run(
+    worker_counts: Optional[List[int]] = None,
+    port: int = 8766,
+    clients: int = 4,
+    concurrency: int = 16,
+    requests: int = 4000,
+    warmup: int = 100,
+    keep_caches: bool = False,
+) -> Dict[str, Any]:
+    worker_counts = worker_counts or default_worker_counts()
+    env = os.environ.copy()
+    if not keep_caches:
+        env.update({"CACHE_BACKEND": "none", "LIST_COALESCE_TTL_SECONDS": "0"})
+
+    runs: Dict[str, Dict[str, Any]] = {}
+    for workers in worker_counts:
+        print(f"Measuring {workers} worker(s)...", file=sys.stderr)
+        runs[str(workers)] = measure(workers, port, env, clients, concurrency, requests, warmup)
+
+    baseline = runs.get("1")
+    for result in runs.values():
+        if baseline and baseline["throughput_rps"]:
+            speedup = result["throughput_rps"] / baseline["throughput_rps"]
+            result["speedup"] = round(speedup, 2)
+            result["efficiency"] = round(speedup / result["workers"], 2)
+
+    return {
+        "meta": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "cpus": available_cpus(),
+            "client_processes": clients,
+            "concurrency_per_client": concurrency,
+            "requests_per_run": requests,
+            "db_pool_budget": env.get("DB_POOL_BUDGET", "30 (gunicorn.conf.py default)"),
+            "caches": "environment" if keep_caches else "disabled",
+        },
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput scaling with gunicorn worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Worker counts to measure (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the started server (default 8766)")
+    parser.add_argument("--clients", type=int, default=4, help="Load generator processes (default 4)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Connections per client process (default 16)")
+    parser.add_argument("--requests", type=int, default=4000, help="Measured requests per worker count (default 4000)")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests per client process (default 100)")
+    parser.add_argument("--keep-caches", action="store_true", help="Keep the environment's cache/coalescing settings")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.workers, args.port, args.clients, args.concurrency, args.requests, args.warmup, args.keep_caches)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
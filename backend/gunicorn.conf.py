@@ -0,0 +1,75 @@
+"""
+Production launcher: gunicorn with uvicorn workers
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Pre-forks WEB_CONCURRENCY workers (default: one per available CPU) from a
+master that has already imported the app (preload_app), so workers start
+without importing it again and share its memory copy-on-write. Database
+engines are created lazily, so each worker builds its own pools after the
+fork, sized from its share of DB_POOL_BUDGET (default 30 connections for the
+whole instance, see core.database.worker_pool_sizes).
+
+Workers are recycled after GUNICORN_MAX_REQUESTS requests, plus a random
+jitter so they don't all restart at once. A recycled or stopped worker
+stops accepting connections and has GUNICORN_GRACEFUL_TIMEOUT seconds to
+finish in-flight requests; its shutdown handler closes its connections.
+
+Settings (environment):
+    WEB_CONCURRENCY               worker processes (default: available CPUs)
+    PORT                          listen port (default 8000)
+    DB_POOL_BUDGET                connections across all workers (default 30)
+    GUNICORN_MAX_REQUESTS         requests before a worker is recycled (default 10000, 0 disables)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests per worker (default 1000)
+    GUNICORN_GRACEFUL_TIMEOUT     seconds to drain a stopping worker (default 30)
+    GUNICORN_TIMEOUT              seconds before a silent worker is killed (default 60)
+"""
+import os
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+# Read by app.core.config when the app is preloaded below
+os.environ.setdefault("DB_POOL_BUDGET", "30")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or _available_cpus()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = 5
+
+
+def on_starting(server):
+    # Refuse to start when the budget can't give every worker a pool
+    from app.core.config import settings
+    from app.core.database import worker_pool_sizes
+
+    if settings.DB_POOL_BUDGET > 0:
+        sizes = worker_pool_sizes(settings.DB_POOL_BUDGET, server.cfg.workers)
+        server.log.info(
+            f"{server.cfg.workers} workers, DB_POOL_BUDGET={settings.DB_POOL_BUDGET}: "
+            f"{sizes['async']} async + {sizes['sync']} sync connections per worker"
+        )
+
+
+def post_fork(server, worker):
+    from app.core.config import settings
+    from app.core.database import reset_engines_after_fork
+
+    # Pools are sized for this worker's share of the budget (--workers on
+    # the command line overrides WEB_CONCURRENCY, so use the real count)
+    settings.WEB_CONCURRENCY = server.cfg.workers
+    # Only the first worker rebuilds the dashboard stats on startup;
+    # recycled workers wait for the regular interval
+    settings.STATS_RECONCILE_ON_STARTUP = settings.STATS_RECONCILE_ON_STARTUP and worker.age == 1
+    reset_engines_after_fork()
@@ -0,0 +1,59 @@
+"""
+Fixtures for the database guard tests
+
+The tests run against DATABASE_URL and are skipped when it can't be reached
+or holds no patients. Seed one first, e.g.:
+    python -m app.migrations && python -m app.generate_data 100000 --fast
+"""
+import os
+
+# Every request does its full work (read by app.core.config on import)
+os.environ["CACHE_BACKEND"] = "none"
+os.environ["LIST_COALESCE_TTL_SECONDS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import models
+from app.core.database import SessionLocal, get_engine
+
+LOGIN = {"email": "doctor@example.com", "password": "doctor123"}
+
+
+@pytest.fixture(scope="session")
+def db_available() -> None:
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        pytest.skip(f"DATABASE_URL not reachable: {e.__class__.__name__}")
+
+
+@pytest.fixture(scope="session")
+def patient_id(db_available) -> str:
+    session = SessionLocal()
+    try:
+        patient_id = session.query(models.Patient.id).order_by(models.Patient.id).limit(1).scalar()
+    finally:
+        session.close()
+    if patient_id is None:
+        pytest.skip("No patients - seed the database first (python -m app.generate_data)")
+    return patient_id
+
+
+@pytest.fixture(scope="session")
+def client(db_available) -> TestClient:
+    # Not used as a context manager: startup (schema check, stats
+    # reconciler) would issue statements of its own
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/auth/login", json=LOGIN)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,102 @@
+"""
+Query guards for the patient endpoints: SQL statement budgets and plans
+
+Statement budgets: each request runs through the app inside
+assert_max_statements, which counts the statements it issues on both
+database engines. A request over its budget fails - e.g. a relationship
+that went back to lazy loading turns a three-statement chart into one query
+per medication. Response caches and list coalescing are off (conftest), so
+every detail request misses the detail cache. List requests run with the
+totals cache cleared ("cold") and filled ("warm").
+
+Query plans: benchmarks.query_plans EXPLAINs every list filter/sort case.
+A case fails on a sequential scan that keeps little of a large table, or
+when a selective case doesn't use its expected index. Tables smaller than
+PLAN_MIN_TABLE_ROWS are not checked (seed with
+``python -m app.generate_data 100000 --fast``).
+"""
+import json
+
+import pytest
+
+from app.core.database import assert_max_statements
+from app.services.totals import invalidate_patient_totals
+from benchmarks import query_plans
+
+# Version lookup, patient joined with medications, documents (IN)
+DETAIL_STATEMENTS = 3
+# Version lookup only (If-None-Match hit)
+NOT_MODIFIED_STATEMENTS = 1
+# List version, total (table estimate - cached per process - then COUNT
+# or, on tables above COUNT_ESTIMATE_THRESHOLD, EXPLAIN and maybe COUNT), page
+LIST_COLD_STATEMENTS = 4
+# List version, page (the total or estimate comes from the totals cache)
+LIST_WARM_STATEMENTS = 2
+
+# Plan checks (see benchmarks.query_plans)
+PLAN_MIN_TABLE_ROWS = 10_000
+PLAN_MAX_SELECTIVITY = 0.1
+
+LIST_PARAMS = [
+    pytest.param({"page_size": 25}, id="default"),
+    pytest.param({"page_size": 25, "status": "critical"}, id="filtered"),
+    pytest.param({"page_size": 25, "page": 40}, id="deep_page"),
+    pytest.param({"page_size": 25, "sort_by": "lastName", "sort_order": "asc"}, id="sorted"),
+]
+
+
+def test_detail(client, auth_headers, patient_id):
+    with assert_max_statements(DETAIL_STATEMENTS):
+        response = client.get(f"/patients/{patient_id}", headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_detail_not_modified(client, auth_headers, patient_id):
+    etag = client.get(f"/patients/{patient_id}", headers=auth_headers).headers["ETag"]
+    with assert_max_statements(NOT_MODIFIED_STATEMENTS):
+        response = client.get(f"/patients/{patient_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("params", LIST_PARAMS)
+def test_list_cold(client, auth_headers, params):
+    invalidate_patient_totals()
+    with assert_max_statements(LIST_COLD_STATEMENTS):
+        response = client.get("/patients", params=params, headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("params", LIST_PARAMS)
+def test_list_warm(client, auth_headers, params):
+    client.get("/patients", params=params, headers=auth_headers)
+    with assert_max_statements(LIST_WARM_STATEMENTS):
+        response = client.get("/patients", params=params, headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_list_cursor_page(client, auth_headers):
+    first_page = client.get("/patients", params={"page_size": 25}, headers=auth_headers).json()
+    if not first_page["nextCursor"]:
+        pytest.skip("Only one page of patients")
+    invalidate_patient_totals()
+    with assert_max_statements(LIST_COLD_STATEMENTS):
+        response = client.get(
+            "/patients", params={"page_size": 25, "cursor": first_page["nextCursor"]}, headers=auth_headers
+        )
+    assert response.status_code == 200
+
+
+def test_list_not_modified(client, auth_headers):
+    params = {"page_size": 25}
+    etag = client.get("/patients", params=params, headers=auth_headers).headers["ETag"]
+    with assert_max_statements(NOT_MODIFIED_STATEMENTS):
+        response = client.get("/patients", params=params, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_list_query_plans(db_available, patient_id):
+    try:
+        report = query_plans.run(PLAN_MIN_TABLE_ROWS, PLAN_MAX_SELECTIVITY)
+    except SystemExit as e:  # no planner statistics yet
+        pytest.skip(str(e))
+    assert not report["failures"], json.dumps(report["failures"], indent=2, default=str)
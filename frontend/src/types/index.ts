@@ -89,4 +89,6 @@ export interface PaginatedPatients {
   page: number;
   pageSize: number;
   totalPages: number;
+  totalIsEstimate?: boolean;
+  nextCursor?: string | null;
 }